@@ -3,16 +3,35 @@ import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
 import json
-import os
-import shutil
-import subprocess
-from glob import glob
+
+from adaptive_stride import AdaptiveScan
+from ffmpeg_reader import iter_ffmpeg_frames
+from frame_sampler import open_sampler
+from pyramid_matcher import PyramidMatcher
+from segment_tracker import DecimatedCurve, SegmentTracker
+from stage_profiler import PROFILER
 
 # === PARAMÈTRES ===
-DOWNSCALE = 0.2
+DOWNSCALE = 1.0  # résolution de vérification (1.0 = scores pleine résolution)
+PYRAMID_SCALE = 0.2  # criblage rapide à basse résolution
+PRE_THRESHOLD = 0.6  # score basse résolution minimal pour vérifier en pleine résolution
 FRAME_SKIP = 15
+# Pas adaptatif : grands sauts loin du seuil, frame par frame autour des transitions
+ADAPTIVE = True
+MAX_STRIDE_SECONDS = 1.0  # ≤ MIN_DURATION : aucune séquence retenue ne peut tomber entre deux échantillons
+ONSET_TOLERANCE_FRAMES = 1  # précision garantie des fronts
+# Pas adaptatif : "ffmpeg" = luminance seule décodée par ffmpeg, "opencv" = grab() des frames sautées.
+# Avec des sauts ≤ 1s, ffmpeg envoie toutes les frames sautées dans le pipe : plus lent que grab() en pleine résolution.
+DECODER = "opencv"
 MATCH_THRESHOLD = 0.85
 MAX_GAP_BETWEEN_HITS = 8.0  # en secondes
+# Séquences : début au-dessus de ON_THRESHOLD, fin sous OFF_THRESHOLD (hystérésis)
+ON_THRESHOLD = MATCH_THRESHOLD
+OFF_THRESHOLD = ON_THRESHOLD  # plus bas pour tolérer les creux ; fin de séquence alors précise au pas près
+MIN_DURATION = 1.0  # secondes
+MIN_GAP_TO_SEPARATE = 4.0  # secondes : séquences plus proches fusionnées
+PLOT = True  # graphique final des scores
+PLOT_POINTS = 2000  # points gardés pour le graphique (score max par tranche) : mémoire bornée
 
 # === CHEMINS ===
 VB_PATH = "C:/Users/Vincent B/Videos/Brads/slowblues/"
@@ -20,7 +39,11 @@ VB_PATH = "C:/Users/Vincent B/Videos/Brads/slowblues/"
 VIDEO_PATH = VB_PATH + "bcglsbpv2-001_hi.mp4"
 TEMPLATE_PATH = VB_PATH + "template_crop.png"
 OUTPUT_JSON = VB_PATH + "T_appearance_info.json"
-TMP_IMG_DIR = os.path.join(VB_PATH, "tmp_frames")
+
+# Profil par étape (décodage ffmpeg, matching) ; aussi activable avec T_DETECTOR_PROFILE=1
+PROFILE = False
+PROFILE_PATH = VB_PATH + "dall3_profile.json"
+PROFILER.enabled = PROFILE or PROFILER.enabled
 
 # === CHARGEMENT TEMPLATE ===
 template = cv2.imread(TEMPLATE_PATH, cv2.IMREAD_GRAYSCALE)
@@ -29,93 +52,74 @@ if DOWNSCALE != 1.0:
 print(f"[DEBUG] template size: {template.shape[::-1]} (w x h)")
 
 w, h = template.shape[::-1]
+matcher = PyramidMatcher(template, coarse_scale=PYRAMID_SCALE, pre_threshold=PRE_THRESHOLD)
 
 # === INFOS VIDÉO ===
 cap = cv2.VideoCapture(VIDEO_PATH)
 fps = cap.get(cv2.CAP_PROP_FPS)
 cap.release()
 
-# === PRÉPARATION DOSSIER TEMPORAIRE ===
-if os.path.exists(TMP_IMG_DIR):
-    shutil.rmtree(TMP_IMG_DIR)
-os.makedirs(TMP_IMG_DIR)
-
-# === EXTRACTION VIA FFMPEG ===
-print("🚀 Extraction des frames via ffmpeg...")
-subprocess.run([
-    "ffmpeg",
-    "-i", VIDEO_PATH,
-    "-vf", f"fps={fps / FRAME_SKIP}",
-    os.path.join(TMP_IMG_DIR, "frame_%05d.jpg")
-], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-
-# === ANALYSE DES FRAMES ===
-hits = []
-results = []
-frame_paths = sorted(glob(os.path.join(TMP_IMG_DIR, "frame_*.jpg")))
-
-for idx, img_path in enumerate(frame_paths):
-    frame = cv2.imread(img_path, cv2.IMREAD_GRAYSCALE)
-    if frame is None:
-        continue
-    if DOWNSCALE != 1.0:
-        frame = cv2.resize(frame, (0, 0), fx=DOWNSCALE, fy=DOWNSCALE)
-    res = cv2.matchTemplate(frame, template, cv2.TM_CCOEFF_NORMED)
-    _, score, _, _ = cv2.minMaxLoc(res)
-    timestamp = idx * FRAME_SKIP / fps
-    results.append((timestamp, score))
-    if score > MATCH_THRESHOLD:
-        hits.append((timestamp, score))
-# === IDENTIFICATION DES FRONTS MONTANTS ET DURÉES ===
-ON_THRESHOLD = MATCH_THRESHOLD
-MIN_DURATION = 1.0  # secondes
+# === ANALYSE DES FRAMES ET FRONTS MONTANTS (en flux, mémoire constante) ===
+tracker = SegmentTracker(ON_THRESHOLD, OFF_THRESHOLD, MIN_DURATION, MIN_GAP_TO_SEPARATE)
 detections = []
-start_ts = None
-
-for t, score in results:
-    if score >= ON_THRESHOLD:
-        if start_ts is None:
-            start_ts = t  # Début de séquence
-    else:
-        if start_ts is not None:
-            duration = t - start_ts
-            if duration >= MIN_DURATION:
-                detections.append({
-                    "timestamp_sec": round(start_ts, 3),
-                    "duration_sec": round(duration, 3),
-                    "score": 1.0  # ou moyenne de score sur la zone si souhaité
-                })
-                print(f"🎯 Front montant à {start_ts:.3f}s — durée={duration:.3f}s")
-            start_ts = None
+curve = DecimatedCurve(PLOT_POINTS)  # courbe réduite, seulement pour le graphique
+last_timestamp = None
 
-# Cas où la vidéo se termine pendant une phase "on"
-if start_ts is not None:
-    duration = results[-1][0] - start_ts
-    if duration >= MIN_DURATION:
+
+def record_segments(segments):
+    for start_ts, duration in segments:
         detections.append({
-            "timestamp_sec": round(start_ts, 3),
-            "duration_sec": round(duration, 3),
-            "score": 1.0
+            "timestamp_sec": start_ts,
+            "duration_sec": duration,
+            "score": 1.0  # ou moyenne de score sur la zone si souhaité
         })
         print(f"🎯 Front montant à {start_ts:.3f}s — durée={duration:.3f}s")
-    # === POST-PROCESSING : fusion des séquences trop proches
-MIN_GAP_TO_SEPARATE = 4.0  # secondes
-merged = []
-
-for d in detections:
-    if not merged:
-        merged.append(d)
-    else:
-        last = merged[-1]
-        gap = d["timestamp_sec"] - (last["timestamp_sec"] + last["duration_sec"])
-        if gap < MIN_GAP_TO_SEPARATE:
-            # Fusion : étendre la durée du précédent
-            last["duration_sec"] = round((d["timestamp_sec"] + d["duration_sec"]) - last["timestamp_sec"], 3)
-        else:
-            merged.append(d)
-
-# Remplace l'ancien tableau
-detections = merged
+
+
+if ADAPTIVE:
+    print("🚀 Analyse à pas adaptatif...")
+    sampler = open_sampler(VIDEO_PATH, scale_factor=DOWNSCALE, decoder=DECODER)
+
+    def score_at(frame_idx):
+        ret, frame = sampler.read_gray(frame_idx)
+        if not ret:
+            return None
+        with PROFILER.stage("match"):
+            return matcher.match(frame)[0]
+
+    scan = AdaptiveScan(
+        score_at, MATCH_THRESHOLD, 1, int(MAX_STRIDE_SECONDS * fps), tolerance=ONSET_TOLERANCE_FRAMES
+    )
+    samples = ((frame_idx / fps, score) for frame_idx, score in scan.scan())
+else:
+    # === DÉCODAGE VIA FFMPEG (fps, échelle et gris appliqués par ffmpeg, sans fichiers temporaires) ===
+    print("🚀 Décodage des frames via ffmpeg...")
+    frames = iter_ffmpeg_frames(VIDEO_PATH, fps=fps / FRAME_SKIP, scale=DOWNSCALE)
+
+    def fixed_samples():
+        for idx, frame in enumerate(frames):
+            with PROFILER.stage("match"):
+                score, _ = matcher.match(frame)
+            yield idx * FRAME_SKIP / fps, score
+
+    samples = fixed_samples()
+
+for timestamp, score in samples:
+    last_timestamp = timestamp
+    if PLOT:
+        curve.push(timestamp, score)
+    record_segments(tracker.push(timestamp, score))
+
+# Cas où la vidéo se termine pendant une phase "on"
+record_segments(tracker.finish())
+
+if ADAPTIVE:
+    sampler.release()
+    print(
+        f"🔢 {scan.samples} frames analysées ({sampler.grabs} décodées sans analyse, {sampler.seeks} seeks) "
+        f"sur {int(last_timestamp * fps) + 1 if last_timestamp is not None else 0}"
+    )
+
 # === CONVERSION EN DICTIONNAIRE {index: (timestamp, duration)}
 onsets_dict = {
     idx: (d["timestamp_sec"], d["duration_sec"])
@@ -158,21 +162,19 @@ with open(OUTPUT_JSON, "w", encoding="utf-8") as f:
     json.dump(detections, f, indent=2)
 
 print(f"✅ {len(detections)} séquences enregistrées dans {OUTPUT_JSON}")
+PROFILER.report(print, PROFILE_PATH)
 
 # === PLOT
-df = pd.DataFrame(results, columns=["timestamp_sec", "score"])
-plt.figure(figsize=(12, 4))
-plt.plot(df["timestamp_sec"], df["score"], label="Score matchTemplate", alpha=0.4)
-for d in detections:
-    plt.axvspan(d["timestamp_sec"], d["timestamp_sec"] + d["duration_sec"], color="green", alpha=0.2)
-    plt.axvline(d["timestamp_sec"], color="green", linestyle="--")
-plt.xlabel("Temps (s)")
-plt.ylabel("Score")
-plt.title("Détections du motif (zones vertes = apparition)")
-plt.grid(True)
-plt.tight_layout()
-plt.show()
-
-# === NETTOYAGE
-shutil.rmtree(TMP_IMG_DIR)
-print("🧹 Dossier temporaire supprimé.")
+if PLOT:
+    df = pd.DataFrame(curve.points, columns=["timestamp_sec", "score"])
+    plt.figure(figsize=(12, 4))
+    plt.plot(df["timestamp_sec"], df["score"], label="Score matchTemplate", alpha=0.4)
+    for d in detections:
+        plt.axvspan(d["timestamp_sec"], d["timestamp_sec"] + d["duration_sec"], color="green", alpha=0.2)
+        plt.axvline(d["timestamp_sec"], color="green", linestyle="--")
+    plt.xlabel("Temps (s)")
+    plt.ylabel("Score")
+    plt.title("Détections du motif (zones vertes = apparition)")
+    plt.grid(True)
+    plt.tight_layout()
+    plt.show()
@@ -0,0 +1,93 @@
+import math
+
+# Score distance from the threshold at which the full stride is used.
+FAR_MARGIN = 0.3
+
+
+def next_stride(score, threshold, min_step, max_step, prev_score=None, prev_stride=None, far_margin=FAR_MARGIN):
+    """Return the number of frames to skip after a sample scoring ``score``.
+
+    The stride grows linearly with the distance to ``threshold`` up to
+    ``max_step`` at ``far_margin``. If the score is moving, the stride also
+    covers at most half the distance to the threshold at the current rate
+    (score change per frame since the previous sample). A NaN score (e.g.
+    masked ``TM_CCOEFF_NORMED`` of a constant template) counts as far from
+    the threshold.
+    """
+    if not math.isfinite(score):
+        return max_step
+    distance = abs(score - threshold)
+    step = max_step * min(distance / far_margin, 1.0)
+    if prev_score is not None and math.isfinite(prev_score) and prev_stride:
+        rate = abs(score - prev_score) / prev_stride
+        if rate > 0:
+            step = min(step, distance / rate / 2)
+    return int(min(max(step, min_step), max_step))
+
+
+class AdaptiveScan:
+    """Sample a score timeline with a stride that shrinks near the threshold.
+
+    ``score_at(frame_idx)`` returns a frame's score, or None past the end.
+    Whenever two consecutive samples are on opposite sides of ``threshold``
+    and more than ``tolerance`` frames apart, the gap is bisected until the
+    crossing is located within ``tolerance`` frames. Runs of matches longer
+    than ``max_step`` frames can therefore never be missed, and their edges
+    are exact to ``tolerance``. ``samples`` counts the frames scored. A NaN
+    score is below the threshold and far from it.
+    """
+
+    def __init__(self, score_at, threshold, min_step, max_step, tolerance=1, far_margin=FAR_MARGIN):
+        self.score_at = score_at
+        self.threshold = threshold
+        self.min_step = max(min_step, 1)
+        self.max_step = max(max_step, self.min_step)
+        self.tolerance = max(tolerance, 1)
+        self.far_margin = far_margin
+        self.samples = 0
+
+    def _score(self, frame_idx):
+        score = self.score_at(frame_idx)
+        if score is not None:
+            self.samples += 1
+        return score
+
+    def _bisect(self, before, after):
+        """Return the samples narrowing the crossing between ``before`` and ``after``, in frame order."""
+        probes = []
+        above = before[1] >= self.threshold
+        while after[0] - before[0] > self.tolerance:
+            mid = (before[0] + after[0]) // 2
+            score = self._score(mid)
+            if score is None:
+                break
+            probes.append((mid, score))
+            if (score >= self.threshold) == above:
+                before = (mid, score)
+            else:
+                after = (mid, score)
+        return sorted(probes)
+
+    def scan(self, start=0, end=None):
+        """Yield ``(frame_idx, score)`` in frame order from ``start`` to ``end`` (None = until EOF)."""
+        prev = None
+        frame_idx = start
+        while end is None or frame_idx < end:
+            score = self._score(frame_idx)
+            if score is None:
+                break
+            if prev is not None and (prev[1] >= self.threshold) != (score >= self.threshold):
+                yield from self._bisect(prev, (frame_idx, score))
+            yield frame_idx, score
+
+            step = next_stride(
+                score,
+                self.threshold,
+                self.min_step,
+                self.max_step,
+                prev_score=prev[1] if prev else None,
+                prev_stride=frame_idx - prev[0] if prev else None,
+                far_margin=self.far_margin,
+            )
+            prev = (frame_idx, score)
+            frame_idx += step
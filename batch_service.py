@@ -0,0 +1,281 @@
+"""Headless batch detection: watch a folder and store every result in SQLite.
+
+Usage:
+    python batch_service.py watch FOLDER --template T.png [--db results.sqlite] [--jobs 2]
+    python batch_service.py show results.sqlite [VIDEO]
+
+New videos are queued once their size stops changing between two polls and
+processed by a pool of ``--jobs`` processes. Only the main process writes to
+the database. A video is processed again only if its size or mtime changed.
+"""
+import argparse
+import os
+import sqlite3
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import cv2
+
+from frame_sampler import DECODERS
+from t_detector import detect_coarse_and_refined
+from t_matching import MATCHER_BACKENDS
+
+VIDEO_EXTENSIONS = (".mp4", ".avi", ".mov", ".mkv", ".ts")
+DEFAULT_DB_NAME = "t_detections.sqlite"
+POLL_SECONDS = 10
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS videos (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    size INTEGER,
+    mtime REAL,
+    fps REAL
+);
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    video_id INTEGER NOT NULL REFERENCES videos(id),
+    size INTEGER,
+    mtime REAL,
+    status TEXT NOT NULL,
+    error TEXT,
+    template_path TEXT,
+    threshold REAL,
+    scale_factor REAL,
+    backend TEXT,
+    decoder TEXT,
+    started_at REAL,
+    finished_at REAL,
+    elapsed_s REAL
+);
+CREATE TABLE IF NOT EXISTS detections (
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    video_id INTEGER NOT NULL REFERENCES videos(id),
+    timestamp_sec REAL NOT NULL,
+    score REAL
+);
+CREATE TABLE IF NOT EXISTS timeline (
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    video_id INTEGER NOT NULL REFERENCES videos(id),
+    timestamp_sec REAL NOT NULL,
+    score REAL,
+    x INTEGER,
+    y INTEGER
+);
+CREATE INDEX IF NOT EXISTS runs_video ON runs(video_id, status);
+CREATE INDEX IF NOT EXISTS detections_video_ts ON detections(video_id, timestamp_sec);
+CREATE INDEX IF NOT EXISTS detections_ts ON detections(timestamp_sec);
+CREATE INDEX IF NOT EXISTS timeline_video_ts ON timeline(video_id, timestamp_sec);
+"""
+
+
+class ResultStore:
+    """SQLite store of videos, runs, detections and coarse score timelines."""
+
+    def __init__(self, db_path):
+        self.conn = sqlite3.connect(db_path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+
+    def recover_interrupted(self):
+        """Mark runs left ``running`` by a stopped service so that their videos are retried."""
+        self.conn.execute("UPDATE runs SET status = 'interrupted' WHERE status = 'running'")
+        self.conn.commit()
+
+    def is_done(self, path, size, mtime):
+        row = self.conn.execute(
+            "SELECT 1 FROM runs JOIN videos ON videos.id = runs.video_id "
+            "WHERE videos.path = ? AND runs.size = ? AND runs.mtime = ? AND runs.status IN ('done', 'failed')",
+            (path, size, mtime),
+        ).fetchone()
+        return row is not None
+
+    def start_run(self, path, size, mtime, settings):
+        self.conn.execute(
+            "INSERT INTO videos (path, size, mtime) VALUES (?, ?, ?) "
+            "ON CONFLICT(path) DO UPDATE SET size = excluded.size, mtime = excluded.mtime",
+            (path, size, mtime),
+        )
+        video_id = self.conn.execute("SELECT id FROM videos WHERE path = ?", (path,)).fetchone()[0]
+        cur = self.conn.execute(
+            "INSERT INTO runs (video_id, size, mtime, status, template_path, threshold, scale_factor, backend, "
+            "decoder, started_at) VALUES (?, ?, ?, 'running', ?, ?, ?, ?, ?, ?)",
+            (
+                video_id,
+                size,
+                mtime,
+                settings["template_path"],
+                settings["threshold"],
+                settings["scale_factor"],
+                settings["backend"],
+                settings["decoder"],
+                time.time(),
+            ),
+        )
+        self.conn.commit()
+        return video_id, cur.lastrowid
+
+    def finish_run(self, run_id, video_id, result):
+        fps = result["fps"]
+        self.conn.execute("UPDATE videos SET fps = ? WHERE id = ?", (fps, video_id))
+        self.conn.executemany(
+            "INSERT INTO detections (run_id, video_id, timestamp_sec, score) VALUES (?, ?, ?, ?)",
+            [(run_id, video_id, ts, score) for ts, score in result["detections"]],
+        )
+        self.conn.executemany(
+            "INSERT INTO timeline (run_id, video_id, timestamp_sec, score, x, y) VALUES (?, ?, ?, ?, ?, ?)",
+            [(run_id, video_id, frame / fps, score, x, y) for frame, score, (x, y) in result["timeline"]],
+        )
+        self.conn.execute(
+            "UPDATE runs SET status = 'done', finished_at = ?, elapsed_s = ? WHERE id = ?",
+            (time.time(), result["elapsed_s"], run_id),
+        )
+        self.conn.commit()
+
+    def fail_run(self, run_id, error):
+        self.conn.execute(
+            "UPDATE runs SET status = 'failed', error = ?, finished_at = ? WHERE id = ?", (error, time.time(), run_id)
+        )
+        self.conn.commit()
+
+    def detections(self, path=None):
+        """Return ``(path, timestamp_sec, score)`` of the latest finished run of each video."""
+        query = (
+            "SELECT videos.path, detections.timestamp_sec, detections.score FROM detections "
+            "JOIN videos ON videos.id = detections.video_id "
+            "WHERE detections.run_id = (SELECT MAX(id) FROM runs WHERE runs.video_id = videos.id "
+            "AND runs.status = 'done')"
+        )
+        params = ()
+        if path:
+            query += " AND videos.path = ?"
+            params = (os.path.abspath(path),)
+        return self.conn.execute(query + " ORDER BY videos.path, detections.timestamp_sec", params).fetchall()
+
+    def close(self):
+        self.conn.close()
+
+
+def _process_video(video_path, settings):
+    """Worker: run the T detector on one video and return its onsets and coarse timeline."""
+    cap = cv2.VideoCapture(video_path)
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    cap.release()
+    if not fps:
+        raise FileNotFoundError(f"Impossible d’ouvrir la vidéo : {video_path}")
+
+    name = os.path.basename(video_path)
+    timeline = []
+    start = time.time()
+    detections = detect_coarse_and_refined(
+        video_path,
+        settings["template_path"],
+        settings["threshold"],
+        settings["scale_factor"],
+        lambda msg: print(f"[{name}] {msg.strip()}") if msg.strip() else None,
+        workers=settings["workers"],
+        use_cache=True,  # the full coarse timeline goes to the database too
+        backend=settings["backend"],
+        decoder=settings["decoder"],
+        results_path=os.path.splitext(video_path)[0] + "_t_timestamps.txt",
+        open_results=False,
+        timeline_callback=timeline.extend,
+    )
+    return {"fps": fps, "detections": detections, "timeline": timeline, "elapsed_s": time.time() - start}
+
+
+def list_videos(folder):
+    """Return ``{path: (size, mtime)}`` for the videos directly inside ``folder``."""
+    videos = {}
+    for entry in os.scandir(folder):
+        if entry.is_file() and entry.name.lower().endswith(VIDEO_EXTENSIONS):
+            stat = entry.stat()
+            videos[os.path.abspath(entry.path)] = (stat.st_size, stat.st_mtime)
+    return videos
+
+
+def watch(folder, store, settings, jobs=1, poll_seconds=POLL_SECONDS, once=False):
+    """Queue stable new videos of ``folder`` and process them with ``jobs`` processes.
+
+    With ``once`` the videos already present are processed and the function
+    returns; otherwise it polls until interrupted.
+    """
+    store.recover_interrupted()
+    previous = {}
+    running = {}  # future -> (path, video_id, run_id)
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        while True:
+            current = list_videos(folder)
+            busy = {path for path, _, _ in running.values()}
+            for path, (size, mtime) in sorted(current.items()):
+                # A file still being copied or recorded changes size between polls.
+                stable = once or previous.get(path) == (size, mtime)
+                if stable and path not in busy and not store.is_done(path, size, mtime):
+                    video_id, run_id = store.start_run(path, size, mtime, settings)
+                    print(f"📥 En file : {os.path.basename(path)}")
+                    running[pool.submit(_process_video, path, settings)] = (path, video_id, run_id)
+            previous = current
+
+            if once and not running:
+                return
+            done, _ = wait(running, timeout=None if once else poll_seconds, return_when=FIRST_COMPLETED)
+            for future in done:
+                path, video_id, run_id = running.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    store.fail_run(run_id, repr(e))
+                    print(f"⚠️ Échec sur {os.path.basename(path)} : {e}")
+                else:
+                    store.finish_run(run_id, video_id, result)
+                    print(
+                        f"✅ {os.path.basename(path)} : {len(result['detections'])} détections "
+                        f"en {result['elapsed_s']:.1f}s"
+                    )
+            if once and not running:
+                return
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Détection T en lot avec stockage SQLite")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    watch_parser = commands.add_parser("watch", help="surveiller un dossier et traiter les nouvelles vidéos")
+    watch_parser.add_argument("folder")
+    watch_parser.add_argument("--template", required=True, help="template T (zones blanches ignorées)")
+    watch_parser.add_argument("--db", help=f"base SQLite (défaut : FOLDER/{DEFAULT_DB_NAME})")
+    watch_parser.add_argument("--threshold", type=float, default=0.75)
+    watch_parser.add_argument("--scale", type=float, default=0.5)
+    watch_parser.add_argument("--backend", default="matchTemplate", choices=list(MATCHER_BACKENDS))
+    watch_parser.add_argument("--decoder", default="opencv", choices=DECODERS)
+    watch_parser.add_argument("--jobs", type=int, default=1, help="vidéos traitées en parallèle")
+    watch_parser.add_argument("--workers", type=int, default=1, help="processus par vidéo")
+    watch_parser.add_argument("--poll", type=float, default=POLL_SECONDS, help="secondes entre deux scans du dossier")
+    watch_parser.add_argument("--once", action="store_true", help="traiter les vidéos présentes puis quitter")
+
+    show_parser = commands.add_parser("show", help="afficher les détections enregistrées")
+    show_parser.add_argument("db")
+    show_parser.add_argument("video", nargs="?")
+
+    args = parser.parse_args()
+    if args.command == "watch":
+        store = ResultStore(args.db or os.path.join(args.folder, DEFAULT_DB_NAME))
+        settings = {
+            "template_path": os.path.abspath(args.template),
+            "threshold": args.threshold,
+            "scale_factor": args.scale,
+            "backend": args.backend,
+            "decoder": args.decoder,
+            "workers": args.workers,
+        }
+        try:
+            watch(args.folder, store, settings, jobs=args.jobs, poll_seconds=args.poll, once=args.once)
+        except KeyboardInterrupt:
+            print("⏹ Arrêt demandé")
+        finally:
+            store.close()
+    else:
+        store = ResultStore(args.db)
+        for path, ts, score in store.detections(args.video):
+            print(f"{path}\t{ts:.3f}\t{score:.3f}")
+        store.close()
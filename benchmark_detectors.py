@@ -0,0 +1,335 @@
+import argparse
+import csv
+import json
+import math
+import multiprocessing
+import os
+import platform
+import re
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+import numpy as np
+
+from t_detector import (
+    detect_coarse_and_refined,
+    generate_t_template_bank,
+    generate_t_template_from_video,
+    t_rectangles,
+)
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# "t_detector:<backend>" runs detect_coarse_and_refined with that matcher backend;
+# "t_detector_bank" uses the cropped template bank instead of the full-frame template.
+DETECTORS = ["t_detector", "t_detector:pyramid", "t_detector:fft", "t_detector_bank", "autoswitch", "hsv", "dall3"]
+
+# Colour (BGR) of the badge shown with the T, for the colour-based script detectors.
+BADGE_COLOR = (0, 140, 255)
+# A detector flagging at least this share of its samples cannot tell the T from the background.
+DEGENERATE_RATIO = 0.9
+
+
+def badge_rect(width, height, y_ratio=0.75):
+    """Return the ``(x0, y0, w, h)`` badge square, left of the stem and clear of the T's contrast ring."""
+    thickness = max(int(width * 0.01), 1)
+    side = 8 * thickness
+    return int(width * 0.1), int(height * y_ratio) - 4 * thickness - side, side, side
+
+
+def make_synthetic_video(path, duration, width, height, fps, interval, on_duration, y_ratio=0.75, seed=0):
+    """Write a test video with a T burned in every ``interval`` seconds.
+
+    The background is a noise texture that pans once per second, so that
+    consecutive samples differ like a real recording. The T is the one drawn
+    by ``generate_t_template_from_video``, shown with a ``BADGE_COLOR``
+    square (``badge_rect``) for the colour-based detectors; each appearance
+    lasts ``on_duration`` seconds. Returns the ground-truth onsets in
+    seconds, rounded to the first frame showing the T.
+    """
+    rng = np.random.default_rng(seed)
+    texture = cv2.GaussianBlur(rng.integers(60, 200, (height + 64, width + 64), dtype=np.uint8), (5, 5), 0)
+    texture = cv2.cvtColor(texture, cv2.COLOR_GRAY2BGR)
+    bar, stem = t_rectangles(width, height, y_ratio)
+    bx, by, bw, bh = badge_rect(width, height, y_ratio)
+
+    # Fractional first onset so that onset accuracy is not trivially on the sampling grid.
+    onset_frames = []
+    start = interval / 2 + 0.37
+    while start + on_duration < duration:
+        onset_frames.append(math.ceil(start * fps))
+        start += interval
+    on_frames = int(on_duration * fps)
+
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), fps, (width, height))
+    n_frames = int(duration * fps)
+    next_onset = 0
+    for i in range(n_frames):
+        offset = (i // max(int(fps), 1)) % 64
+        frame = texture[offset:offset + height, offset:offset + width].copy()
+        while next_onset < len(onset_frames) and i >= onset_frames[next_onset] + on_frames:
+            next_onset += 1
+        if next_onset < len(onset_frames) and i >= onset_frames[next_onset]:
+            for (x0, y0), (x1, y1) in (bar, stem):
+                frame[y0:y1 + 1, x0:x1 + 1] = 0
+            frame[by:by + bh, bx:bx + bw] = BADGE_COLOR
+        writer.write(frame)
+    writer.release()
+    return [f / fps for f in onset_frames], onset_frames
+
+
+def write_script_templates(video_path, workdir, onset_frame, fps, y_ratio=0.75):
+    """Write the crops, full frame and metadata the script detectors expect.
+
+    ``template_crop.png`` and its metadata frame the badge: the autoswitch
+    and HSV scripts read its colour, which the grey background lacks.
+    Dall3 matches shapes in grayscale and gets the T junction,
+    ``t_crop.png``.
+    """
+    cap = cv2.VideoCapture(video_path)
+    cap.set(cv2.CAP_PROP_POS_FRAMES, onset_frame + 5)
+    ret, frame = cap.read()
+    cap.release()
+    if not ret:
+        raise ValueError(f"Impossible de lire la vidéo : {video_path}")
+
+    height, width = frame.shape[:2]
+    thickness = max(int(width * 0.01), 1)
+    x_center, y_bar = width // 2, int(height * y_ratio)
+    x0, y0 = x_center - 4 * thickness, y_bar - 6 * thickness
+    w, h = 8 * thickness, 8 * thickness
+    cv2.imwrite(os.path.join(workdir, "t_crop.png"), frame[y0:y0 + h, x0:x0 + w])
+    x0, y0, w, h = badge_rect(width, height, y_ratio)
+    cv2.imwrite(os.path.join(workdir, "template_crop.png"), frame[y0:y0 + h, x0:x0 + w])
+    cv2.imwrite(os.path.join(workdir, "template_fullframe.png"), frame)
+    meta = {"x0": x0, "y0": y0, "width": w, "height": h, "timestamp_sec": onset_frame / fps, "motion_expected": False}
+    with open(os.path.join(workdir, "template_meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+
+
+def _run_script(script, overrides, skip_calls=()):
+    """Execute a configuration-at-the-top script with some constants replaced.
+
+    Every ``NAME = ...`` assignment whose name is in ``overrides`` is
+    rewritten, and top-level calls to ``skip_calls`` (e.g. Tk previews) are
+    dropped.
+    """
+    path = os.path.join(SCRIPT_DIR, script)
+    with open(path, "r", encoding="utf-8") as f:
+        lines = f.read().splitlines()
+
+    patched = []
+    for line in lines:
+        m = re.match(r"^([A-Z_]+)\s*=", line)
+        if m and m.group(1) in overrides:
+            line = f"{m.group(1)} = {overrides[m.group(1)]!r}"
+        elif any(line.startswith(f"{name}(") for name in skip_calls):
+            line = "pass"
+        patched.append(line)
+    exec(compile("\n".join(patched), path, "exec"), {"__name__": "__benchmark__", "__file__": path})
+
+
+def _csv_onsets(csv_path, max_gap):
+    """Group per-sample CSV detections into onsets (first timestamp of each run).
+
+    Returns the onsets and the number of flagged samples.
+    """
+    with open(csv_path, "r", encoding="utf-8") as f:
+        timestamps = sorted(float(row["timestamp_sec"]) for row in csv.DictReader(f))
+    onsets = []
+    for i, ts in enumerate(timestamps):
+        if i == 0 or ts - timestamps[i - 1] > max_gap:
+            onsets.append(ts)
+    return onsets, len(timestamps)
+
+
+def _peak_rss_mb():
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = max(
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss,
+    )
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere.
+    return peak / 2**20 if sys.platform == "darwin" else peak / 2**10
+
+
+def _run_detector(name, video_path, workdir, threshold):
+    """Run one detector in this (fresh) process and return its onsets and cost."""
+    os.environ.setdefault("MPLBACKEND", "Agg")
+    workdir_prefix = workdir + "/"
+    start = time.perf_counter()
+    flagged = samples = None
+    if name.startswith("t_detector"):
+        backend = name.partition(":")[2] or "matchTemplate"
+        if name.startswith("t_detector_bank"):
+            template = generate_t_template_bank(video_path, os.path.join(workdir, "t_template_bank.json"))
+        else:
+            template = generate_t_template_from_video(video_path, os.path.join(workdir, "t_template.png"))
+        matches = detect_coarse_and_refined(
+            video_path,
+            template,
+            threshold,
+            0.5,
+            lambda msg: None,
+            backend=backend,
+            results_path=os.path.join(workdir, f"{name.replace(':', '_')}.txt"),
+            open_results=False,
+        )
+        onsets = [ts for ts, _ in matches]
+    elif name in ("autoswitch", "hsv"):
+        output_csv = os.path.join(workdir, "t_hsv_detections.csv")
+        overrides = {
+            "VB_PATH": workdir_prefix,
+            "VIDEO_PATH": video_path,
+            "TEMPLATE_IMAGE_PATH": os.path.join(workdir, "template_crop.png"),
+            "TEMPLATE_META_PATH": os.path.join(workdir, "template_meta.json"),
+            "OUTPUT_CSV_PATH": output_csv,
+            "FRAME_IMAGE_PATH": os.path.join(workdir, "template_fullframe.png"),
+            "PROFILE_PATH": os.path.join(workdir, f"{name}_profile.json"),
+        }
+        script = "template_detector_autoswitch.py" if name == "autoswitch" else "hsv_detector_from_template.py"
+        _run_script(script, overrides, skip_calls=("show_template_frame_with_meta",))
+        onsets, flagged = _csv_onsets(output_csv, max_gap=1.5)
+        # Both scripts sample one frame per second.
+        cap = cv2.VideoCapture(video_path)
+        samples = len(range(0, int(cap.get(cv2.CAP_PROP_FRAME_COUNT)), int(cap.get(cv2.CAP_PROP_FPS))))
+        cap.release()
+    elif name == "dall3":
+        output_json = os.path.join(workdir, "T_appearance_info.json")
+        _run_script(
+            "Dall3.py",
+            {
+                "VB_PATH": workdir_prefix,
+                "VIDEO_PATH": video_path,
+                "TEMPLATE_PATH": os.path.join(workdir, "t_crop.png"),
+                "OUTPUT_JSON": output_json,
+                "PLOT": False,
+            },
+        )
+        with open(output_json, "r", encoding="utf-8") as f:
+            onsets = [d["timestamp_sec"] for d in json.load(f)]
+    else:
+        raise ValueError(f"Détecteur inconnu : {name}")
+    return {
+        "elapsed_s": time.perf_counter() - start,
+        "onsets": onsets,
+        "flagged_samples": flagged,
+        "samples": samples,
+        "peak_rss_mb": _peak_rss_mb(),
+    }
+
+
+def onset_accuracy(truth, detected, tolerance):
+    """Match each true onset to the closest unused detection within ``tolerance`` seconds."""
+    unused = sorted(detected)
+    errors = []
+    for t in truth:
+        candidates = [d for d in unused if abs(d - t) <= tolerance]
+        if not candidates:
+            continue
+        best = min(candidates, key=lambda d: abs(d - t))
+        unused.remove(best)
+        errors.append(best - t)
+    return {
+        "matched": len(errors),
+        "missed": len(truth) - len(errors),
+        "false_positives": len(unused),
+        "mean_abs_error_s": float(np.mean(np.abs(errors))) if errors else None,
+        "max_abs_error_s": float(np.max(np.abs(errors))) if errors else None,
+    }
+
+
+def _git_commit():
+    try:
+        out = subprocess.run(["git", "rev-parse", "HEAD"], cwd=SCRIPT_DIR, capture_output=True, check=True)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return out.stdout.decode().strip()
+
+
+def run_benchmark(args):
+    workdir = args.workdir or tempfile.mkdtemp(prefix="t_bench_")
+    os.makedirs(workdir, exist_ok=True)
+    video_path = os.path.join(workdir, "synthetic.mp4")
+
+    print(f"🎞 Génération de la vidéo synthétique ({args.duration}s, {args.width}x{args.height}, {args.fps} fps)...")
+    truth, onset_frames = make_synthetic_video(
+        video_path, args.duration, args.width, args.height, args.fps, args.interval, args.on_duration
+    )
+    if not truth:
+        raise ValueError("Vidéo trop courte : aucune apparition du T")
+    write_script_templates(video_path, workdir, onset_frames[0], args.fps)
+    n_frames = int(args.duration * args.fps)
+
+    results = []
+    for name in args.detectors:
+        print(f"⏱ {name}...")
+        # One fresh process per detector, so peak RSS is its own.
+        with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+            try:
+                run = pool.submit(_run_detector, name, video_path, workdir, args.threshold).result()
+            except Exception as e:
+                print(f"⚠️ {name} a échoué : {e}")
+                results.append({"detector": name, "error": repr(e)})
+                continue
+        run["detector"] = name
+        run["video_frames_per_s"] = n_frames / run["elapsed_s"]
+        run["accuracy"] = onset_accuracy(truth, run["onsets"], args.tolerance)
+        run["degenerate"] = bool(run["samples"]) and run["flagged_samples"] >= DEGENERATE_RATIO * run["samples"]
+        results.append(run)
+        print(
+            f"   {run['elapsed_s']:.1f}s, {run['video_frames_per_s']:.0f} frames/s, "
+            f"onsets trouvés {run['accuracy']['matched']}/{len(truth)}"
+        )
+        if run["degenerate"]:
+            print(
+                f"⚠️ {name} signale {run['flagged_samples']}/{run['samples']} échantillons : "
+                "il ne distingue pas le motif du fond, ses résultats ne sont pas significatifs"
+            )
+
+    report = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "commit": _git_commit(),
+        "platform": platform.platform(),
+        "python": platform.python_version(),
+        "opencv": cv2.__version__,
+        "video": {
+            "duration_s": args.duration,
+            "width": args.width,
+            "height": args.height,
+            "fps": args.fps,
+            "interval_s": args.interval,
+            "on_duration_s": args.on_duration,
+            "truth_onsets_s": truth,
+        },
+        "threshold": args.threshold,
+        "tolerance_s": args.tolerance,
+        "results": results,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"✅ Résultats enregistrés dans {args.output}")
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark des détecteurs sur vidéo synthétique")
+    parser.add_argument("--duration", type=float, default=300, help="durée de la vidéo (s)")
+    parser.add_argument("--width", type=int, default=960)
+    parser.add_argument("--height", type=int, default=540)
+    parser.add_argument("--fps", type=float, default=30)
+    parser.add_argument("--interval", type=float, default=130, help="écart entre deux apparitions du T (s)")
+    parser.add_argument("--on-duration", type=float, default=20, help="durée d'une apparition (s)")
+    parser.add_argument("--threshold", type=float, default=0.75, help="seuil du détecteur T")
+    parser.add_argument("--tolerance", type=float, default=5, help="écart max pour apparier un onset (s)")
+    parser.add_argument("--detectors", nargs="+", default=DETECTORS, help=f"parmi {DETECTORS}")
+    parser.add_argument("--workdir", help="dossier de travail (temporaire par défaut)")
+    parser.add_argument("--output", default="bench_results.json")
+    run_benchmark(parser.parse_args())
@@ -0,0 +1,131 @@
+import hashlib
+import json
+import os
+
+import cv2
+import numpy as np
+
+# Bump when the derived fields change, so stale cache files are recompiled.
+COMPILE_VERSION = 1
+CACHE_NAME = "template_compiled.npz"
+
+# Default HSV tolerance around the template's mean colour (H, S, V).
+HSV_TOL = (15, 50, 50)
+
+# cv2.KeyPoint fields stored per row in the cache.
+_KEYPOINT_FIELDS = ("x", "y", "size", "angle", "response", "octave", "class_id")
+
+
+def choose_strategy(mean_s, std_s, surface, num_kp):
+    """Pick ``template_match``, ``orb`` or ``hsv`` from the template statistics."""
+    if mean_s < 20 and std_s < 20 and surface < 2000:
+        return "template_match"
+    elif num_kp >= 10:
+        return "orb"
+    else:
+        return "hsv"
+
+
+class CompiledTemplate:
+    """A template crop with every form the detectors derive from it, computed once.
+
+    ``gray``, ``hsv_lower``/``hsv_upper`` (mean HSV colour ± ``hsv_tol``),
+    ``mask`` (non-white pixels, as for the T templates), the ORB
+    ``keypoints``/``descriptors`` and the chosen ``strategy``. ``derived``
+    holds these as arrays when they come from the cache; use
+    ``load_compiled_template`` rather than building one directly.
+    """
+
+    def __init__(self, template, meta, hsv_tol=HSV_TOL, derived=None):
+        self.template = template
+        self.meta = meta
+        self.hsv_tol = tuple(hsv_tol)
+        self.x0, self.y0 = meta["x0"], meta["y0"]
+        self.width, self.height = meta["width"], meta["height"]
+        self.motion_expected = meta.get("motion_expected", False)
+        if derived is None:
+            derived = _derive(template, meta, self.hsv_tol)
+
+        self.gray = derived["gray"]
+        self.mask = derived["mask"]
+        self.mean_s, self.std_s = (float(v) for v in derived["s_stats"])
+        self.hsv_mean = derived["hsv_mean"]
+        self.hsv_lower = derived["hsv_lower"]
+        self.hsv_upper = derived["hsv_upper"]
+        self.keypoints = tuple(
+            cv2.KeyPoint(x, y, size, angle, response, int(octave), int(class_id))
+            for x, y, size, angle, response, octave, class_id in derived["keypoints"]
+        )
+        self.descriptors = derived["descriptors"] if len(derived["descriptors"]) else None
+        self.strategy = str(derived["strategy"])
+
+
+def _derive(template, meta, hsv_tol):
+    """Compute the forms of ``template`` kept by ``CompiledTemplate``, as cacheable arrays."""
+    gray = cv2.cvtColor(template, cv2.COLOR_BGR2GRAY)
+    _, mask = cv2.threshold(gray, 250, 255, cv2.THRESH_BINARY_INV)
+
+    hsv = cv2.cvtColor(template, cv2.COLOR_BGR2HSV)
+    mean_s = np.mean(hsv[:, :, 1])
+    std_s = np.std(hsv[:, :, 1])
+    hsv_mean = np.array(cv2.mean(hsv)[:3])
+    tol = np.array(hsv_tol)
+
+    keypoints, descriptors = cv2.ORB_create().detectAndCompute(template, None)
+    strategy = choose_strategy(mean_s, std_s, meta["width"] * meta["height"], len(keypoints))
+    return {
+        "gray": gray,
+        "mask": mask,
+        "s_stats": np.array([mean_s, std_s]),
+        "hsv_mean": hsv_mean,
+        "hsv_lower": np.maximum(hsv_mean - tol, 0),
+        "hsv_upper": np.minimum(hsv_mean + tol, [179, 255, 255]),
+        "keypoints": np.array(
+            [[kp.pt[0], kp.pt[1], kp.size, kp.angle, kp.response, kp.octave, kp.class_id] for kp in keypoints],
+            dtype=np.float64,
+        ).reshape(-1, len(_KEYPOINT_FIELDS)),
+        "descriptors": descriptors if descriptors is not None else np.empty((0, 32), np.uint8),
+        "strategy": np.array(strategy),
+    }
+
+
+def _compile_key(template_path, meta, hsv_tol):
+    digest = hashlib.sha1(f"v{COMPILE_VERSION}:{tuple(hsv_tol)}:{cv2.__version__}".encode())
+    with open(template_path, "rb") as f:
+        digest.update(f.read())
+    digest.update(json.dumps(meta, sort_keys=True).encode())
+    return digest.hexdigest()
+
+
+def load_compiled_template(template_path, meta_path, hsv_tol=HSV_TOL, use_cache=True):
+    """Return the ``CompiledTemplate`` of ``template_path``, cached next to ``meta_path``.
+
+    The cache file is reused while the template image, the metadata, the
+    tolerances and the OpenCV version are unchanged, and rewritten otherwise.
+    """
+    template = cv2.imread(template_path)
+    if template is None:
+        raise FileNotFoundError(f"Template introuvable : {template_path}")
+    with open(meta_path, "r", encoding="utf-8") as f:
+        meta = json.load(f)
+
+    cache_path = os.path.join(os.path.dirname(os.path.abspath(meta_path)), CACHE_NAME)
+    key = _compile_key(template_path, meta, hsv_tol)
+    if use_cache:
+        try:
+            with np.load(cache_path, allow_pickle=False) as data:
+                if str(data["key"]) == key:
+                    return CompiledTemplate(template, meta, hsv_tol, derived=dict(data))
+        except (OSError, KeyError, ValueError):
+            pass
+
+    derived = _derive(template, meta, hsv_tol)
+    if use_cache:
+        tmp_path = cache_path + ".tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                np.savez(f, key=np.array(key), **derived)
+            os.replace(tmp_path, cache_path)
+        except OSError:
+            pass
+    return CompiledTemplate(template, meta, hsv_tol, derived=derived)
@@ -0,0 +1,117 @@
+import json
+import subprocess
+
+import cv2
+import numpy as np
+
+from stage_profiler import PROFILER
+
+# A yielded frame stays valid until this many further frames have been read.
+RING_SIZE = 4
+
+
+def _frame_size(video_path):
+    cap = cv2.VideoCapture(video_path)
+    width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    cap.release()
+    if not width or not height:
+        raise FileNotFoundError(f"Impossible d’ouvrir la vidéo : {video_path}")
+    return width, height
+
+
+def keyframe_indices(video_path, fps, read_seconds=None):
+    """Return the sorted keyframe indices of ``video_path`` using ffprobe, or None.
+
+    With ``read_seconds`` only the start of the video is probed.
+    """
+    command = [
+        "ffprobe",
+        "-v", "error",
+        "-select_streams", "v:0",
+        "-skip_frame", "nokey",
+        "-show_entries", "frame=pts_time",
+        "-of", "json",
+    ]
+    if read_seconds is not None:
+        command += ["-read_intervals", f"%+{read_seconds}"]
+    command.append(video_path)
+    try:
+        out = subprocess.run(command, check=True, capture_output=True).stdout
+    except (FileNotFoundError, subprocess.CalledProcessError):
+        return None
+
+    frames = json.loads(out).get("frames", [])
+    indices = {int(round(float(f["pts_time"]) * fps)) for f in frames if "pts_time" in f}
+    return sorted(indices) or None
+
+
+def iter_ffmpeg_frames(
+    video_path, fps=None, scale=1.0, start_time=None, ring_size=RING_SIZE, follow_timeout=None, frame_size=None
+):
+    """Yield grayscale frames of ``video_path`` decoded by ffmpeg into preallocated buffers.
+
+    The ``fps`` resampling, the ``scale`` resize and the gray conversion all
+    run inside ffmpeg, which writes raw frames to a pipe; nothing touches the
+    disk. Converting yuv to gray keeps the Y plane, so chroma is never
+    touched. ``start_time`` (seconds) seeks before decoding. Frames are
+    ``uint8`` arrays of shape ``(height, width)`` taken from a ring of
+    ``ring_size`` buffers, so copy a frame to keep it longer.
+
+    With ``follow_timeout`` (seconds) a local file still being written is
+    followed past its current end, and the stream ends once it has not grown
+    for that long. ``video_path`` can also be any input URL ffmpeg reads
+    (``udp://``, ``tcp://``...); pass its source ``(width, height)`` as
+    ``frame_size`` when OpenCV cannot probe it.
+    """
+    src_w, src_h = frame_size or _frame_size(video_path)
+    width = max(int(round(src_w * scale)), 1)
+    height = max(int(round(src_h * scale)), 1)
+
+    filters = []
+    if fps:
+        filters.append(f"fps={fps}")
+    if (width, height) != (src_w, src_h):
+        filters.append(f"scale={width}:{height}:flags=area")
+    command = ["ffmpeg", "-v", "error"]
+    if start_time:
+        command += ["-ss", f"{start_time:.6f}"]
+    if follow_timeout:
+        command += ["-follow", "1", "-rw_timeout", str(int(follow_timeout * 1e6))]
+        video_path = "file:" + video_path
+    command += ["-i", video_path]
+    if filters:
+        command += ["-vf", ",".join(filters)]
+    command += ["-pix_fmt", "gray", "-f", "rawvideo", "-"]
+
+    try:
+        proc = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    except FileNotFoundError:
+        raise RuntimeError("ffmpeg n'est pas installé")
+
+    ring = [np.empty((height, width), np.uint8) for _ in range(ring_size)]
+    frames_read = 0
+    try:
+        while True:
+            buf = ring[frames_read % ring_size]
+            view = memoryview(buf).cast("B")
+            filled = 0
+            with PROFILER.stage("decode"):
+                while filled < len(view):
+                    n = proc.stdout.readinto(view[filled:])
+                    if not n:
+                        break
+                    filled += n
+            if filled < len(view):
+                break
+            frames_read += 1
+            yield buf
+        if frames_read == 0 and proc.wait() != 0:
+            error = proc.stderr.read().decode(errors="replace").strip()
+            raise RuntimeError(f"Échec du décodage ffmpeg : {error}")
+    finally:
+        proc.stdout.close()
+        if proc.poll() is None:
+            proc.kill()
+        proc.wait()
+        proc.stderr.close()
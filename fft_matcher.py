@@ -0,0 +1,91 @@
+import cv2
+import numpy as np
+
+BATCH_SIZE = 16
+# Most padded frame pixels transformed at once (about 40 bytes each at the peak): a batch
+# of large frames is split so memory stays bounded at any analysis scale.
+PIXEL_BUDGET = 2**22
+
+# Windows whose masked variance is below this are flat and score 0.
+_MIN_VARIANCE = 1e-6
+
+
+class FFTBatchMatcher:
+    """Masked normalized cross-correlation of whole frame batches with vectorized FFTs.
+
+    Scores match ``cv2.TM_CCOEFF_NORMED`` with a binary mask: the zero-mean
+    masked template is correlated with the frame, and each window is
+    normalized by its masked standard deviation. The template spectra are
+    computed once per frame size; ``match_batch`` stacks the frames so one
+    ``rfft2`` call covers as many of them as ``PIXEL_BUDGET`` allows.
+    Everything runs in float32, with each frame's mean removed first to
+    keep the window sums small.
+    """
+
+    name = "fft"
+
+    def __init__(self, template, mask=None, batch_size=BATCH_SIZE):
+        self.template = template
+        self.mask = mask
+        self.batch_size = batch_size
+
+        m = np.ones(template.shape, np.float64) if mask is None else (mask > 0).astype(np.float64)
+        t = template.astype(np.float64)
+        self.n = m.sum()
+        t_zero_mean = m * (t - (m * t).sum() / self.n)
+        self.t_norm = np.sqrt((t_zero_mean ** 2).sum())
+        self.t_zero_mean = t_zero_mean.astype(np.float32)
+        self.m = m.astype(np.float32)
+        self._spectra = {}
+
+    def _template_spectra(self, shape):
+        if shape not in self._spectra:
+            self._spectra[shape] = (
+                np.conj(np.fft.rfft2(self.t_zero_mean, s=shape)),
+                np.conj(np.fft.rfft2(self.m, s=shape)),
+            )
+        return self._spectra[shape]
+
+    def match_batch(self, grays):
+        """Return ``[(max_val, max_loc), ...]`` for a list of same-sized grayscale frames."""
+        frame_h, frame_w = grays[0].shape[:2]
+        shape = (cv2.getOptimalDFTSize(frame_h), cv2.getOptimalDFTSize(frame_w))
+        chunk = max(PIXEL_BUDGET // (shape[0] * shape[1]), 1)
+        results = []
+        for i in range(0, len(grays), chunk):
+            results.extend(self._match_chunk(grays[i:i + chunk], shape))
+        return results
+
+    def _match_chunk(self, grays, shape):
+        frames = np.stack(grays).astype(np.float32)
+        frames -= frames.mean(axis=(1, 2), keepdims=True)
+        _, frame_h, frame_w = frames.shape
+        th, tw = self.template.shape[:2]
+        t_spec, m_spec = self._template_spectra(shape)
+
+        f_spec = np.fft.rfft2(frames, s=shape)
+        f2_spec = np.fft.rfft2(frames * frames, s=shape)
+        del frames
+        valid = (slice(None), slice(0, frame_h - th + 1), slice(0, frame_w - tw + 1))
+        # Contiguous copies of the valid windows, so the padded results are freed right away.
+        numerator = np.ascontiguousarray(np.fft.irfft2(f_spec * t_spec, s=shape)[valid])
+        window_sum = np.ascontiguousarray(np.fft.irfft2(f_spec * m_spec, s=shape)[valid])
+        del f_spec
+        window_sq_sum = np.ascontiguousarray(np.fft.irfft2(f2_spec * m_spec, s=shape)[valid])
+        del f2_spec
+
+        variance = window_sq_sum - window_sum * window_sum / self.n
+        denominator = self.t_norm * np.sqrt(np.maximum(variance, 0))
+        scores = np.zeros_like(numerator)
+        np.divide(numerator, denominator, out=scores, where=variance > _MIN_VARIANCE * self.n)
+        np.clip(scores, -1.0, 1.0, out=scores)
+
+        results = []
+        for res in scores:
+            y, x = np.unravel_index(np.argmax(res), res.shape)
+            results.append((float(res[y, x]), (int(x), int(y))))
+        return results
+
+    def match(self, gray):
+        """Return ``(max_val, max_loc)`` of the template in a grayscale frame."""
+        return self.match_batch([gray])[0]
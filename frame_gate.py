@@ -0,0 +1,59 @@
+import cv2
+import numpy as np
+
+THUMB_SIZE = (64, 36)
+
+
+class GatedMatcher:
+    """Wrap a matcher and reuse the last score while the picture does not change.
+
+    Each frame is reduced to a ``THUMB_SIZE`` thumbnail and compared with the
+    thumbnail of the last frame actually scored. When no thumbnail pixel
+    differs by more than ``max_diff`` gray levels, the previous result is
+    returned without matching. The max (not mean) difference keeps thin
+    overlays such as the T from being averaged away.
+    """
+
+    def __init__(self, inner, max_diff):
+        self.inner = inner
+        self.name = f"gate{max_diff:g}+{inner.name}"
+        self.mask = inner.mask
+        self.max_diff = max_diff
+        self.batch_size = getattr(inner, "batch_size", 1)
+
+        self.reference = None
+        self.last_result = None
+        self.scored = 0
+        self.skipped = 0
+
+    def _is_static(self, gray):
+        thumb = cv2.resize(gray, THUMB_SIZE, interpolation=cv2.INTER_AREA).astype(np.int16)
+        if self.reference is not None and np.abs(thumb - self.reference).max() <= self.max_diff:
+            self.skipped += 1
+            return True
+        self.reference = thumb
+        self.scored += 1
+        return False
+
+    def match(self, gray):
+        """Return ``(max_val, max_loc)`` of the template in a grayscale frame."""
+        if not self._is_static(gray):
+            self.last_result = self.inner.match(gray)
+        return self.last_result
+
+    def match_batch(self, grays):
+        """Return ``[(max_val, max_loc), ...]``, scoring only the frames that changed."""
+        static = [self._is_static(gray) for gray in grays]
+        fresh = [gray for gray, skip in zip(grays, static) if not skip]
+        fresh_results = iter(self.inner.match_batch(fresh) if len(fresh) > 1 else map(self.inner.match, fresh))
+
+        results = []
+        for skip in static:
+            if not skip:
+                self.last_result = next(fresh_results)
+            results.append(self.last_result)
+        return results
+
+    def skip_ratio(self):
+        total = self.scored + self.skipped
+        return self.skipped / total if total else 0.0
@@ -0,0 +1,165 @@
+import functools
+import statistics
+
+import cv2
+
+from ffmpeg_reader import iter_ffmpeg_frames, keyframe_indices
+from stage_profiler import PROFILER
+
+# Typical keyframe interval for x264/NVENC recordings (x264 keyint default), used when ffprobe
+# cannot measure the video's own.
+DEFAULT_GOP_SIZE = 250
+# Seconds of video probed for keyframes: the encoder settings do not change mid-file.
+GOP_PROBE_SECONDS = 120
+
+DECODERS = ["opencv", "ffmpeg"]
+
+
+class FrameSampler:
+    """Read frames by index, decoding sequentially instead of seeking when cheaper.
+
+    A seek with ``CAP_PROP_POS_FRAMES`` decodes from the previous keyframe, so
+    for forward gaps shorter than a GOP it is cheaper to ``grab()`` the
+    intermediate frames (decode without BGR conversion) and only ``retrieve()``
+    the one we need. Backward jumps and gaps longer than ``gop_size`` still
+    use a real seek.
+    """
+
+    def __init__(self, cap, gop_size=DEFAULT_GOP_SIZE, scale_factor=1.0):
+        self.cap = cap
+        self.fps = cap.get(cv2.CAP_PROP_FPS)
+        self.gop_size = gop_size
+        self.scale_factor = scale_factor
+        self.pos = int(cap.get(cv2.CAP_PROP_POS_FRAMES))
+        self.seeks = 0
+        self.grabs = 0
+
+    def read(self, frame_idx):
+        """Return ``(ret, frame)`` for ``frame_idx`` like ``cap.read()``."""
+        gap = frame_idx - self.pos
+        if gap < 0 or gap > self.gop_size:
+            with PROFILER.stage("seek"):
+                self.cap.set(cv2.CAP_PROP_POS_FRAMES, frame_idx)
+            self.seeks += 1
+            self.pos = frame_idx
+        else:
+            while self.pos < frame_idx:
+                with PROFILER.stage("grab"):
+                    grabbed = self.cap.grab()
+                if not grabbed:
+                    return False, None
+                self.grabs += 1
+                self.pos += 1
+
+        with PROFILER.stage("decode"):
+            ret, frame = self.cap.read()
+        if ret:
+            self.pos += 1
+        return ret, frame
+
+    def read_gray(self, frame_idx, out=None):
+        """Return ``(ret, gray)`` for ``frame_idx`` in grayscale at ``scale_factor``.
+
+        ``gray`` is written into ``out`` when it has the right shape.
+        """
+        ret, frame = self.read(frame_idx)
+        if not ret:
+            return False, None
+        with PROFILER.stage("gray"):
+            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY, dst=out if self.scale_factor == 1.0 else None)
+        if self.scale_factor != 1.0:
+            with PROFILER.stage("resize"):
+                gray = cv2.resize(gray, (0, 0), dst=out, fx=self.scale_factor, fy=self.scale_factor)
+        return True, gray
+
+    def release(self):
+        self.cap.release()
+
+
+class FfmpegLumaSampler:
+    """Sampler whose frames come from ffmpeg as luma only, already at ``scale_factor``.
+
+    Only ``read_gray`` is available. Skipped frames still go through the pipe,
+    but at analysis size they are cheap. A backward jump or a gap longer
+    than ``gop_size`` restarts ffmpeg with an input seek.
+    """
+
+    def __init__(self, video_path, gop_size=DEFAULT_GOP_SIZE, scale_factor=1.0):
+        cap = cv2.VideoCapture(video_path)
+        self.fps = cap.get(cv2.CAP_PROP_FPS)
+        cap.release()
+        self.video_path = video_path
+        self.gop_size = gop_size
+        self.scale_factor = scale_factor
+        self.frames = None
+        self.pos = 0
+        self.seeks = 0
+        self.grabs = 0
+
+    def _restart(self, frame_idx):
+        self.release()
+        # Half a frame early so rounding cannot skip the target frame.
+        start_time = (frame_idx - 0.5) / self.fps if frame_idx > 0 else None
+        with PROFILER.stage("seek"):
+            self.frames = iter_ffmpeg_frames(self.video_path, scale=self.scale_factor, start_time=start_time)
+        self.pos = frame_idx
+        self.seeks += 1
+
+    def read_gray(self, frame_idx, out=None):
+        """Return ``(ret, gray)`` for ``frame_idx`` in grayscale at ``scale_factor``.
+
+        ``gray`` is copied into ``out`` when it has the right shape.
+        """
+        gap = frame_idx - self.pos
+        if self.frames is None or gap < 0 or gap > self.gop_size:
+            self._restart(frame_idx)
+
+        while self.pos < frame_idx:
+            if next(self.frames, None) is None:
+                return False, None
+            PROFILER.count("grab")
+            self.grabs += 1
+            self.pos += 1
+
+        gray = next(self.frames, None)
+        if gray is None:
+            return False, None
+        self.pos += 1
+        # The reader reuses its buffers; callers may keep frames (e.g. batches).
+        with PROFILER.stage("copy"):
+            if out is not None and out.shape == gray.shape:
+                out[...] = gray
+                gray = out
+            else:
+                gray = gray.copy()
+        return True, gray
+
+    def release(self):
+        if self.frames is not None:
+            self.frames.close()
+            self.frames = None
+
+
+@functools.lru_cache(maxsize=32)
+def video_gop_size(video_path, fps):
+    """Return the median keyframe interval of ``video_path`` in frames, or ``DEFAULT_GOP_SIZE`` without ffprobe."""
+    keyframes = keyframe_indices(video_path, fps, read_seconds=GOP_PROBE_SECONDS)
+    if not keyframes or len(keyframes) < 2:
+        return DEFAULT_GOP_SIZE
+    return max(int(statistics.median(b - a for a, b in zip(keyframes, keyframes[1:]))), 1)
+
+
+def open_sampler(video_path, gop_size=None, scale_factor=1.0, decoder="opencv"):
+    """Open ``video_path`` with the ``decoder`` backend (one of ``DECODERS``).
+
+    ``gop_size`` defaults to the video's own keyframe interval (``video_gop_size``).
+    """
+    if decoder not in DECODERS:
+        raise ValueError(f"Décodeur inconnu : {decoder}")
+    cap = cv2.VideoCapture(video_path)
+    if gop_size is None:
+        gop_size = video_gop_size(video_path, cap.get(cv2.CAP_PROP_FPS))
+    if decoder == "ffmpeg":
+        cap.release()
+        return FfmpegLumaSampler(video_path, gop_size=gop_size, scale_factor=scale_factor)
+    return FrameSampler(cap, gop_size=gop_size, scale_factor=scale_factor)
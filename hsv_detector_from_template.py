@@ -5,6 +5,10 @@ import json
 import csv
 import os
 
+from frame_sampler import FrameSampler, video_gop_size
+from stage_profiler import PROFILER
+from window_tracker import WindowTracker
+
 import tkinter as tk
 from PIL import Image, ImageTk, ImageDraw
 def show_template_frame_with_meta(image_path, meta_path):
@@ -42,6 +46,14 @@ TEMPLATE_IMAGE_PATH = "C:/Users/Vincent B/Videos/Brads/slowblues/template_crop.p
 TEMPLATE_META_PATH = "C:/Users/Vincent B/Videos/Brads/slowblues/template_meta.json"
 OUTPUT_CSV_PATH = "C:/Users/Vincent B/Videos/Brads/slowblues/t_hsv_detections.csv"
 
+# Profil par étape (seek, décodage, conversions, classification) ; aussi activable avec T_DETECTOR_PROFILE=1
+PROFILE = False
+PROFILE_PATH = "C:/Users/Vincent B/Videos/Brads/slowblues/hsv_profile.json"
+PROFILER.enabled = PROFILE or PROFILER.enabled
+
+# Mode mobile : suivi du motif dans une fenêtre autour de la position prédite (sinon masque plein cadre)
+TRACKING = True
+
 # === CHARGEMENT DU MOTIF ET DES MÉTADONNÉES ===
 template = cv2.imread(TEMPLATE_IMAGE_PATH)
 if template is None:
@@ -65,6 +77,23 @@ H_TOL, S_TOL, V_TOL = 20, 50, 50
 lower_bound = np.array([max(0, hue_mean - H_TOL), max(0, sat_mean - S_TOL), max(0, val_mean - V_TOL)])
 upper_bound = np.array([min(179, hue_mean + H_TOL), min(255, sat_mean + S_TOL), min(255, val_mean + V_TOL)])
 
+
+def locate_blob(frame):
+    """Plus grande zone de la couleur du template, si elle couvre au moins 50% de sa taille."""
+    hsv = cv2.cvtColor(frame, cv2.COLOR_BGR2HSV)
+    mask = cv2.inRange(hsv, lower_bound, upper_bound)
+    contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    best = None
+    for cnt in contours:
+        x, y, ww, hh = cv2.boundingRect(cnt)
+        area = ww * hh
+        if area >= w * h * 0.5 and (best is None or area > best[4]):
+            best = (x, y, ww, hh, area)
+    return best
+
+
+tracker = WindowTracker(locate_blob, w, h) if motion_expected and TRACKING else None
+
 # === OUVERTURE VIDÉO ===
 cap = cv2.VideoCapture(VIDEO_PATH)
 if not cap.isOpened():
@@ -73,6 +102,7 @@ if not cap.isOpened():
 fps = cap.get(cv2.CAP_PROP_FPS)
 total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
 step = int(fps)  # une frame par seconde
+sampler = FrameSampler(cap, gop_size=video_gop_size(VIDEO_PATH, fps))
 # Optionnel : affichage diagnostic visuel
 show_template_frame_with_meta("C:/Users/Vincent B/Videos/Brads/slowblues/template_fullframe.png", "C:/Users/Vincent B/Videos/Brads/slowblues/template_meta.json")
 
@@ -83,16 +113,22 @@ print(f"🔢 Frames à analyser : {total_frames // step}")
 results = []
 
 for frame_idx in range(0, total_frames, step):
-    cap.set(cv2.CAP_PROP_POS_FRAMES, frame_idx)
-    ret, frame = cap.read()
+    ret, frame = sampler.read(frame_idx)
     if not ret:
         continue
 
-    hsv = cv2.cvtColor(frame, cv2.COLOR_BGR2HSV)
-
-    if motion_expected:
-        mask = cv2.inRange(hsv, lower_bound, upper_bound)
-        contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    if tracker is not None:
+        with PROFILER.stage("classify"):
+            detection = tracker.track(frame, frame_idx)
+        if detection is not None:
+            timestamp = round(frame_idx / fps, 2)
+            results.append([timestamp, *detection])
+    elif motion_expected:
+        with PROFILER.stage("hsv"):
+            hsv = cv2.cvtColor(frame, cv2.COLOR_BGR2HSV)
+        with PROFILER.stage("classify"):
+            mask = cv2.inRange(hsv, lower_bound, upper_bound)
+            contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
         for cnt in contours:
             x, y, ww, hh = cv2.boundingRect(cnt)
             area = ww * hh
@@ -100,14 +136,22 @@ for frame_idx in range(0, total_frames, step):
                 timestamp = round(frame_idx / fps, 2)
                 results.append([timestamp, x, y, ww, hh, area])
     else:
-        roi = hsv[y0:y0 + h, x0:x0 + w]
-        mask = cv2.inRange(roi, lower_bound, upper_bound)
-        match_ratio = np.sum(mask > 0) / (w * h)
+        # Seule la ROI est convertie en HSV
+        with PROFILER.stage("hsv"):
+            roi = cv2.cvtColor(frame[y0:y0 + h, x0:x0 + w], cv2.COLOR_BGR2HSV)
+        with PROFILER.stage("classify"):
+            mask = cv2.inRange(roi, lower_bound, upper_bound)
+            match_ratio = cv2.countNonZero(mask) / (w * h)
         if match_ratio > 0.5:  # seuil de match 50%
             timestamp = round(frame_idx / fps, 2)
             results.append([timestamp, x0, y0, w, h, match_ratio])
 
-cap.release()
+sampler.release()
+if tracker is not None:
+    print(
+        f"🎯 Suivi : {tracker.window_searches} recherches locales, {tracker.full_searches} plein cadre, "
+        f"{tracker.losses} pertes de suivi"
+    )
 
 # === SAUVEGARDE CSV ===
 with open(OUTPUT_CSV_PATH, "w", newline="", encoding="utf-8") as csvfile:
@@ -117,3 +161,4 @@ with open(OUTPUT_CSV_PATH, "w", newline="", encoding="utf-8") as csvfile:
 
 print(f"✅ Détection terminée : {len(results)} occurrences trouvées.")
 print(f"📄 Résultats : {OUTPUT_CSV_PATH}")
+PROFILER.report(print, PROFILE_PATH)
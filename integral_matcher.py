@@ -0,0 +1,145 @@
+import cv2
+import numpy as np
+
+# Every CHECK_EVERY frames the score is recomputed with matchTemplate (0 = never).
+CHECK_EVERY = 25
+# Largest score difference, and location difference (pixels) on matching frames, still counted as agreement.
+AGREEMENT_TOLERANCE = 0.02
+AGREEMENT_MIN_SCORE = 0.5
+
+
+def t_boxes(template):
+    """Return the bar and stem of the dark T in ``template`` as ``(x0, y0, x1, y1)`` boxes (end exclusive).
+
+    The bar is made of the rows holding at least half as many dark pixels
+    as the fullest row; the stem is the bounding box of the other dark
+    pixels (None when there are none).
+    """
+    dark = template < 128
+    rows = dark.sum(axis=1)
+    if not rows.any():
+        raise ValueError("Aucun T sombre dans le template")
+    bar_rows = np.flatnonzero(rows >= rows.max() / 2)
+    bar_cols = np.flatnonzero(dark[bar_rows].any(axis=0))
+    bar = (bar_cols[0], bar_rows[0], bar_cols[-1] + 1, bar_rows[-1] + 1)
+
+    rest = dark.copy()
+    rest[bar_rows] = False
+    ys, xs = np.nonzero(rest)
+    stem = (xs.min(), ys.min(), xs.max() + 1, ys.max() + 1) if len(xs) else None
+    return bar, stem
+
+
+def _expand(box, margin, width, height):
+    x0, y0, x1, y1 = box
+    return max(x0 - margin, 0), max(y0 - margin, 0), min(x1 + margin, width), min(y1 + margin, height)
+
+
+def _intersect(a, b):
+    x0, y0, x1, y1 = max(a[0], b[0]), max(a[1], b[1]), min(a[2], b[2]), min(a[3], b[3])
+    return (x0, y0, x1, y1) if x0 < x1 and y0 < y1 else None
+
+
+def _union_terms(a, b):
+    """Return ``[(box, sign), ...]`` whose signed sums give the sum over ``a`` union ``b``."""
+    if b is None:
+        return [(a, 1)]
+    terms = [(a, 1), (b, 1)]
+    overlap = _intersect(a, b)
+    if overlap is not None:
+        terms.append((overlap, -1))
+    return terms
+
+
+def _area(terms):
+    return sum(sign * (x1 - x0) * (y1 - y0) for (x0, y0, x1, y1), sign in terms)
+
+
+def _box_sums(integral, terms, positions_h, positions_w):
+    """Sum of the signed boxes at every template position, from an integral image."""
+    total = 0
+    for (x0, y0, x1, y1), sign in terms:
+        total = total + sign * (
+            integral[y1:y1 + positions_h, x1:x1 + positions_w]
+            - integral[y0:y0 + positions_h, x1:x1 + positions_w]
+            - integral[y1:y1 + positions_h, x0:x0 + positions_w]
+            + integral[y0:y0 + positions_h, x0:x0 + positions_w]
+        )
+    return total
+
+
+class IntegralTMatcher:
+    """Score the T as two rectangles with integral images instead of ``matchTemplate``.
+
+    The bar and stem are read from the template's dark pixels (``t_boxes``),
+    so templates from ``generate_t_template_from_video`` and bank crops both
+    work. The score is the normalized correlation of the frame with a dark T
+    on a bright ring one bar thickness wide: masked ``TM_CCOEFF_NORMED`` of
+    that two-level template. It only needs rectangle sums, which the
+    integral and squared integral of the frame give in O(1) per position.
+
+    Every ``check_every`` frames the frame is also scored like the
+    ``matchTemplate`` backend does, with the template itself and its
+    ``mask``; ``checks``, ``disagreements`` and ``max_score_diff`` record
+    how far the rectangle approximation is from it.
+    """
+
+    name = "integral"
+
+    def __init__(self, template, mask=None, check_every=CHECK_EVERY):
+        self.template = template
+        self.mask = mask
+        self.check_every = check_every
+        height, width = template.shape[:2]
+        bar, stem = t_boxes(template)
+        thickness = bar[3] - bar[1]
+
+        self.dark_terms = _union_terms(bar, stem)
+        stem_ring = _expand(stem, thickness, width, height) if stem is not None else None
+        self.support_terms = _union_terms(_expand(bar, thickness, width, height), stem_ring)
+        self.n_dark = _area(self.dark_terms)
+        self.n_support = _area(self.support_terms)
+        self.n_bright = self.n_support - self.n_dark
+        # Template term of the normalization: ||u - mean(u)|| for the bright-ring indicator u.
+        self.template_norm = np.sqrt(self.n_dark * self.n_bright / self.n_support)
+
+        self.frames = 0
+        self.checks = 0
+        self.disagreements = 0
+        self.max_score_diff = 0.0
+
+    def scores(self, gray):
+        """Return the score map over every template position, like ``matchTemplate``."""
+        height, width = self.template.shape[:2]
+        positions_h, positions_w = gray.shape[0] - height + 1, gray.shape[1] - width + 1
+        integral, squared = cv2.integral2(gray, sdepth=cv2.CV_64F, sqdepth=cv2.CV_64F)
+        sum_dark = _box_sums(integral, self.dark_terms, positions_h, positions_w)
+        sum_support = _box_sums(integral, self.support_terms, positions_h, positions_w)
+        sq_support = _box_sums(squared, self.support_terms, positions_h, positions_w)
+
+        sum_bright = sum_support - sum_dark
+        numerator = (self.n_dark * sum_bright - self.n_bright * sum_dark) / self.n_support
+        variance = np.maximum(sq_support - sum_support * sum_support / self.n_support, 0)
+        denominator = self.template_norm * np.sqrt(variance)
+        return np.divide(numerator, denominator, out=np.zeros_like(numerator), where=denominator > 1e-6)
+
+    def reference_scores(self, gray):
+        """Score map of the ``matchTemplate`` backend (masked ``TM_CCOEFF_NORMED`` of the template), for agreement checks."""
+        return cv2.matchTemplate(gray, self.template, cv2.TM_CCOEFF_NORMED, mask=self.mask)
+
+    def match(self, gray):
+        """Return ``(max_val, max_loc)`` of the T in a grayscale frame."""
+        _, max_val, _, max_loc = cv2.minMaxLoc(self.scores(gray))
+        self.frames += 1
+        if self.check_every and self.frames % self.check_every == 0:
+            self._check(gray, max_val, max_loc)
+        return max_val, max_loc
+
+    def _check(self, gray, max_val, max_loc):
+        _, ref_val, _, ref_loc = cv2.minMaxLoc(np.nan_to_num(self.reference_scores(gray)))
+        diff = abs(ref_val - max_val)
+        moved = max(abs(ref_loc[0] - max_loc[0]), abs(ref_loc[1] - max_loc[1])) > 1
+        self.checks += 1
+        self.max_score_diff = max(self.max_score_diff, diff)
+        if diff > AGREEMENT_TOLERANCE or (moved and ref_val >= AGREEMENT_MIN_SCORE):
+            self.disagreements += 1
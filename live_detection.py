@@ -0,0 +1,142 @@
+"""Detect T onsets in a recording still being written, or in a live stream.
+
+Usage: python live_detection.py SOURCE TEMPLATE.png [--threshold 0.75] [--scale 0.5] [--idle 10]
+
+SOURCE is a local MKV/MPEG-TS file (followed as it grows) or any input URL
+ffmpeg can read, e.g. ``udp://127.0.0.1:1234`` fed by
+``ffmpeg -re -i rec.mp4 -f mpegts udp://127.0.0.1:1234`` (then pass
+``--fps`` and ``--size``). A plain MP4 only becomes readable once its
+recording is finished, unless it is written fragmented.
+"""
+import argparse
+import os
+import time
+from collections import deque
+
+import cv2
+
+from ffmpeg_reader import iter_ffmpeg_frames
+from onset_search import find_rising_edge
+from t_matching import COOLDOWN_SECONDS, MATCHER_BACKENDS
+from template_bank import load_t_matcher
+
+# Seconds without new data before a followed file is considered finished.
+IDLE_TIMEOUT = 10
+
+
+def wait_for_video_info(source, timeout):
+    """Return ``(fps, (width, height))`` of ``source`` once its header can be read."""
+    deadline = time.monotonic() + timeout
+    while True:
+        cap = cv2.VideoCapture(source)
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        size = (int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+        cap.release()
+        if fps and all(size):
+            return fps, size
+        if time.monotonic() > deadline:
+            raise FileNotFoundError(f"Impossible d’ouvrir la vidéo : {source}")
+        time.sleep(1)
+
+
+def detect_live(
+    source,
+    template_path,
+    threshold,
+    scale_factor,
+    log_callback=print,
+    backend="matchTemplate",
+    idle_timeout=IDLE_TIMEOUT,
+    fps=None,
+    frame_size=None,
+    results_path=None,
+):
+    """Follow ``source`` with one ffmpeg decoder and report each T onset as soon as it is seen.
+
+    Every frame is decoded once, in order, and every second one is scored.
+    After a match the next ``COOLDOWN_SECONDS`` are skipped, as in the
+    offline pass. The onset is searched among the frames decoded since the
+    previous sample, which stay in a ring buffer, so a detection is
+    reported at most one sample after the T appears. Memory stays constant
+    and nothing already read is decoded again. Each onset is logged,
+    appended to ``results_path`` and returned as ``(seconds, score)``.
+    """
+    if fps is None or frame_size is None:
+        probed_fps, probed_size = wait_for_video_info(source, idle_timeout)
+        fps = fps or probed_fps
+        frame_size = frame_size or probed_size
+
+    matcher = load_t_matcher(template_path, scale_factor, backend)
+    jump_frames = max(int(fps), 1)
+    cooldown_frames = int(COOLDOWN_SECONDS * fps)
+
+    # Ring of jump_frames + 2 buffers: the frames since the last sample stay valid without copies.
+    frames = iter_ffmpeg_frames(
+        source,
+        scale=scale_factor,
+        ring_size=jump_frames + 2,
+        follow_timeout=idle_timeout if os.path.isfile(source) else None,
+        frame_size=frame_size,
+    )
+    recent = deque(maxlen=jump_frames + 1)
+    detections = []
+    next_sample = 0
+
+    log_callback(f"📡 Suivi de {source} (arrêt après {idle_timeout:g}s sans nouvelles données)")
+    try:
+        for frame_idx, gray in enumerate(frames):
+            recent.append((frame_idx, gray))
+            if frame_idx < next_sample:
+                continue
+            score, _ = matcher.match(gray)
+            if score < threshold:
+                next_sample = frame_idx + jump_frames
+                continue
+
+            buffered = dict(recent)
+
+            def score_at(idx):
+                if idx == frame_idx:
+                    return score
+                return matcher.match(buffered[idx])[0] if idx in buffered else None
+
+            onset, onset_score = find_rising_edge(score_at, threshold, frame_idx, recent[0][0], jump_frames)
+            ts = onset / fps
+            detections.append((ts, onset_score))
+            log_callback(f"🎯 Apparition à {ts:.3f}s (score={onset_score:.3f}) → saut de 2min")
+            if results_path:
+                with open(results_path, "a") as f:
+                    f.write(f"{ts:.3f}\n")
+            next_sample = frame_idx + cooldown_frames
+    finally:
+        frames.close()
+
+    log_callback(f"⏹ Fin du flux. {len(detections)} apparitions détectées")
+    return detections
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Détection T sur un enregistrement en cours ou un flux")
+    parser.add_argument("source", help="fichier en cours d'écriture ou URL lue par ffmpeg")
+    parser.add_argument("template", help="template T (zones blanches ignorées) ou banque de templates JSON")
+    parser.add_argument("--threshold", type=float, default=0.75)
+    parser.add_argument("--scale", type=float, default=0.5)
+    parser.add_argument("--backend", default="matchTemplate", choices=list(MATCHER_BACKENDS))
+    parser.add_argument("--idle", type=float, default=IDLE_TIMEOUT, help="secondes sans données avant l'arrêt")
+    parser.add_argument("--fps", type=float, help="fréquence du flux (sinon lue dans l'en-tête)")
+    parser.add_argument("--size", help="taille du flux LARGEURxHAUTEUR (sinon lue dans l'en-tête)")
+    parser.add_argument("--output", help="fichier où ajouter chaque apparition")
+    args = parser.parse_args()
+
+    size = tuple(int(v) for v in args.size.lower().split("x")) if args.size else None
+    detect_live(
+        args.source,
+        args.template,
+        args.threshold,
+        args.scale,
+        backend=args.backend,
+        idle_timeout=args.idle,
+        fps=args.fps,
+        frame_size=size,
+        results_path=args.output,
+    )
@@ -0,0 +1,64 @@
+import queue
+import threading
+import time
+
+
+class LogChannel:
+    """Pass log lines and progress from a detection thread to the Tk main loop.
+
+    The worker only appends to a queue (``log``) or overwrites the latest
+    progress value (``progress``), so it never waits on the UI. The main
+    loop calls ``drain`` on a timer and updates the widgets in one go.
+    """
+
+    def __init__(self):
+        self.messages = queue.SimpleQueue()
+        self._lock = threading.Lock()
+        self._progress = None
+        self._phase = None
+
+    def log(self, msg):
+        self.messages.put(msg)
+
+    def progress(self, phase, done, total):
+        """Record that ``done`` of ``total`` units of ``phase`` are processed."""
+        now = time.monotonic()
+        with self._lock:
+            if self._phase is None or self._phase[0] != phase:
+                self._phase = (phase, now, done)
+            self._progress = (phase, done, total, now)
+
+    def reset_progress(self):
+        """Forget the last phase, e.g. before a new run, so its rate is not averaged in."""
+        with self._lock:
+            self._progress = None
+            self._phase = None
+
+    def drain(self, max_messages=500):
+        """Return ``(lines, progress)`` with at most ``max_messages`` queued lines.
+
+        ``progress`` is None when nothing new was reported, otherwise
+        ``(phase, fraction, units_per_s, eta_s)``; the rate and ETA are
+        None until they can be estimated.
+        """
+        lines = []
+        while len(lines) < max_messages:
+            try:
+                lines.append(self.messages.get_nowait())
+            except queue.Empty:
+                break
+
+        with self._lock:
+            latest, self._progress = self._progress, None
+            phase_start = self._phase
+        if latest is None:
+            return lines, None
+
+        phase, done, total, now = latest
+        _, start_time, start_done = phase_start
+        fraction = min(done / total, 1.0) if total else 0.0
+        rate = eta = None
+        if now > start_time and done > start_done:
+            rate = (done - start_done) / (now - start_time)
+            eta = max(total - done, 0) / rate
+        return lines, (phase, fraction, rate, eta)
@@ -0,0 +1,114 @@
+"""Detect several templates in one decode of a video.
+
+Usage: python multi_template.py VIDEO TEMPLATES.json
+
+TEMPLATES.json is a list of objects with the keys ``template`` (PNG path,
+white areas ignored), ``threshold``, and optionally ``name``, ``mask``
+(PNG path, non-zero = compared), ``scale`` (default 1.0), ``strategy``
+(a T detector matcher backend, default ``matchTemplate``), ``output``
+(CSV path, default ``<name>_detections.csv`` next to the video) and
+``x0``/``y0``/``margin`` (search only around that full-resolution
+position, see ``template_bank``). A template bank file is a valid list.
+"""
+import argparse
+import csv
+import json
+import os
+import time
+
+import cv2
+
+from frame_sampler import FrameSampler, video_gop_size
+from template_bank import load_entry_matcher
+
+
+class TemplateJob:
+    """One template of a multi-template run and its result stream."""
+
+    def __init__(self, spec, video_path):
+        self.name = spec.get("name") or os.path.splitext(os.path.basename(spec["template"]))[0]
+        self.threshold = spec["threshold"]
+        self.scale = spec.get("scale", 1.0)
+        self.matcher = load_entry_matcher(spec, self.scale, spec.get("strategy", "matchTemplate"))
+        self.height, self.width = self.matcher.inner.template.shape[:2]
+        self.output = spec.get("output") or os.path.join(
+            os.path.dirname(os.path.abspath(video_path)), f"{self.name}_detections.csv"
+        )
+        self.detections = 0
+        self._file = None
+        self._writer = None
+
+    def open(self):
+        self._file = open(self.output, "w", newline="", encoding="utf-8")
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(["timestamp_sec", "x", "y", "width", "height", "score"])
+
+    def feed(self, timestamp, gray):
+        max_val, (x, y) = self.matcher.match(gray)
+        if max_val >= self.threshold:
+            self.detections += 1
+            self._writer.writerow([round(timestamp, 2), x, y, self.width, self.height, round(max_val, 3)])
+
+    def close(self):
+        if self._file:
+            self._file.close()
+
+
+def load_template_jobs(config_path, video_path):
+    with open(config_path, "r", encoding="utf-8") as f:
+        specs = json.load(f)
+    return [TemplateJob(spec, video_path) for spec in specs]
+
+
+def detect_templates(video_path, jobs, step_seconds=1.0, log_callback=print):
+    """Decode ``video_path`` once every ``step_seconds`` and feed each sample to every job.
+
+    Every sampled frame is converted to grayscale once and resized once per
+    distinct job scale.
+    """
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise FileNotFoundError(f"Impossible d’ouvrir la vidéo : {video_path}")
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    step = max(int(fps * step_seconds), 1)
+    sampler = FrameSampler(cap, gop_size=video_gop_size(video_path, fps))
+    scales = sorted({job.scale for job in jobs})
+
+    log_callback(f"🔍 {len(jobs)} templates, une frame toutes les {step_seconds:g}s")
+    start_time = time.time()
+    samples = 0
+    for job in jobs:
+        job.open()
+    try:
+        frame_idx = 0
+        while True:
+            ret, frame = sampler.read(frame_idx)
+            if not ret:
+                break
+            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+            grays = {
+                scale: gray if scale == 1.0 else cv2.resize(gray, (0, 0), fx=scale, fy=scale)
+                for scale in scales
+            }
+            timestamp = frame_idx / fps
+            for job in jobs:
+                job.feed(timestamp, grays[job.scale])
+            samples += 1
+            frame_idx += step
+    finally:
+        sampler.release()
+        for job in jobs:
+            job.close()
+
+    log_callback(f"⏱ {samples} frames décodées en {time.time() - start_time:.1f}s")
+    for job in jobs:
+        log_callback(f"✅ {job.name} : {job.detections} détections → {job.output}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Détection multi-templates en un seul décodage")
+    parser.add_argument("video")
+    parser.add_argument("templates", help="fichier JSON décrivant les templates")
+    parser.add_argument("--step", type=float, default=1.0, help="secondes entre deux frames analysées")
+    args = parser.parse_args()
+    detect_templates(args.video, load_template_jobs(args.templates, args.video), args.step)
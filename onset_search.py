@@ -0,0 +1,46 @@
+def find_rising_edge(score_at, threshold, hit_frame, lo, first_step, linear_window=16):
+    """Return ``(onset_frame, score)`` of the run of matches that contains ``hit_frame``.
+
+    ``score_at(frame_idx)`` returns the match score of a frame (None when it
+    cannot be read). Returns ``(-1, score)`` when ``hit_frame`` itself is
+    below ``threshold``.
+
+    The search gallops backwards from ``hit_frame`` with doubling steps
+    (starting at ``first_step``) until it finds a non-match or reaches
+    ``lo``, bisects the bracket down to ``linear_window`` frames, then reads
+    that last window sequentially to get the first matching frame.
+    """
+    scores = {}
+
+    def matches(frame_idx):
+        if frame_idx not in scores:
+            scores[frame_idx] = score_at(frame_idx)
+        score = scores[frame_idx]
+        return score is not None and score >= threshold
+
+    if not matches(hit_frame):
+        return -1, scores[hit_frame]
+    good = hit_frame
+    bad = None
+    step = max(first_step, 1)
+    while bad is None:
+        probe = max(good - step, lo)
+        if probe == good:
+            return good, scores[good]
+        if matches(probe):
+            good = probe
+            step *= 2
+        else:
+            bad = probe
+
+    while good - bad > linear_window:
+        mid = (good + bad) // 2
+        if matches(mid):
+            good = mid
+        else:
+            bad = mid
+
+    for frame_idx in range(bad + 1, good):
+        if matches(frame_idx):
+            return frame_idx, scores[frame_idx]
+    return good, scores[good]
@@ -0,0 +1,89 @@
+import cv2
+import numpy as np
+
+# Inliers needed to accept a detection, and Lowe's ratio test threshold.
+MIN_INLIERS = 10
+RATIO = 0.75
+# Frame keypoints are matched by decreasing response, CHUNK_SIZE at a time.
+CHUNK_SIZE = 128
+FRAME_FEATURES = 1000
+# ORB drops keypoints closer to the border than its patch size, so the ROI is padded by it.
+ROI_MARGIN = 31
+RANSAC_REPROJ_THRESHOLD = 3.0
+
+
+class OrbMatcher:
+    """Locate a textured template in frames from its ORB keypoints.
+
+    The template keypoints and descriptors come from ``CompiledTemplate``,
+    which caches them on disk, and are held by a brute-force Hamming
+    matcher. Frame keypoints are matched in rounds of ``chunk_size`` with a
+    ratio test; after each round the matches are fitted with a RANSAC
+    similarity and matching stops as soon as ``min_inliers`` agree. With
+    ``roi=(x, y, w, h)`` keypoints are only extracted around that region.
+    """
+
+    name = "orb"
+
+    def __init__(
+        self,
+        keypoints,
+        descriptors,
+        roi=None,
+        min_inliers=MIN_INLIERS,
+        ratio=RATIO,
+        chunk_size=CHUNK_SIZE,
+        frame_features=FRAME_FEATURES,
+    ):
+        if descriptors is None or len(keypoints) < 2:
+            raise ValueError("Pas assez de points ORB dans le template pour la stratégie orb")
+        self.template_points = np.float32([kp.pt for kp in keypoints])
+        self.matcher = cv2.BFMatcher(cv2.NORM_HAMMING)
+        self.matcher.add([descriptors])
+        self.matcher.train()
+        self.orb = cv2.ORB_create(nfeatures=frame_features)
+        self.roi = roi
+        self.min_inliers = min_inliers
+        self.ratio = ratio
+        self.chunk_size = chunk_size
+
+    def _region(self, gray):
+        if self.roi is None:
+            return gray, 0, 0
+        x, y, w, h = self.roi
+        left, top = max(x - ROI_MARGIN, 0), max(y - ROI_MARGIN, 0)
+        return gray[top:y + h + ROI_MARGIN, left:x + w + ROI_MARGIN], left, top
+
+    def locate(self, gray):
+        """Return ``(inliers, (x, y))``, the template's top-left corner in ``gray``, or ``(0, None)``."""
+        region, left, top = self._region(gray)
+        keypoints, descriptors = self.orb.detectAndCompute(region, None)
+        if descriptors is None or len(keypoints) < self.min_inliers:
+            return 0, None
+        order = np.argsort([-kp.response for kp in keypoints])
+
+        src, dst = [], []
+        best = (0, None)
+        for start in range(0, len(order), self.chunk_size):
+            chunk = order[start:start + self.chunk_size]
+            for pair in self.matcher.knnMatch(descriptors[chunk], k=2):
+                if len(pair) == 2 and pair[0].distance < self.ratio * pair[1].distance:
+                    src.append(self.template_points[pair[0].trainIdx])
+                    dst.append(keypoints[chunk[pair[0].queryIdx]].pt)
+            if len(src) + len(order) - start - len(chunk) < self.min_inliers:
+                break  # even the remaining keypoints cannot reach min_inliers
+            if len(src) < self.min_inliers:
+                continue
+
+            model, inlier_mask = cv2.estimateAffinePartial2D(
+                np.float32(src), np.float32(dst), method=cv2.RANSAC, ransacReprojThreshold=RANSAC_REPROJ_THRESHOLD
+            )
+            if model is None:
+                continue
+            inliers = int(inlier_mask.sum())
+            if inliers > best[0]:
+                x, y = model[:, 2]
+                best = (inliers, (int(round(x)) + left, int(round(y)) + top))
+            if inliers >= self.min_inliers:
+                break
+        return best
@@ -0,0 +1,144 @@
+import bisect
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+
+from ffmpeg_reader import keyframe_indices
+from frame_sampler import open_sampler
+from stage_profiler import PROFILER
+from t_matching import refine_coarse_match, scan_grid
+
+# More shards than workers so a slow shard does not hold up the whole pool.
+SHARDS_PER_WORKER = 4
+
+
+def shard_bounds(total_frames, n_shards, keyframes=None, first_frame=0):
+    """Split ``[first_frame, total_frames)`` into ``(start, end)`` shards, snapping starts to keyframes."""
+    starts = {first_frame}
+    span = max(total_frames - first_frame, 0)
+    for i in range(1, n_shards):
+        start = first_frame + span * i // n_shards
+        if keyframes:
+            k = bisect.bisect_right(keyframes, start) - 1
+            start = max(keyframes[k] if k >= 0 else 0, first_frame)
+        starts.add(start)
+    starts = sorted(starts)
+    return list(zip(starts, starts[1:] + [total_frames]))
+
+
+def apply_cooldown(scores, threshold, cooldown_frames):
+    """Yield ``(frame_idx, score)`` for the first match of each run, ignoring matches within ``cooldown_frames`` of it.
+
+    ``scores`` is an ordered iterable of ``(frame_idx, score, loc)``. Every shard scores
+    the whole sampling grid, so the cooldown is applied here, across shard
+    edges. Unlike the sequential pass the grid does not restart at the end of
+    a cooldown, so a match can land up to one sampling step later. Scans
+    that already skip the cooldown pass through unchanged.
+    """
+    next_allowed = 0
+    for frame_idx, score, _ in scores:
+        if frame_idx < next_allowed or score < threshold:
+            continue
+        yield frame_idx, score
+        next_allowed = frame_idx + cooldown_frames
+
+
+def _start_worker_profile(profile):
+    PROFILER.enabled = profile
+    PROFILER.reset()
+
+
+def _worker_profile():
+    return PROFILER.snapshot() if PROFILER.enabled else None
+
+
+def _scan_shard(video_path, matcher, scale_factor, decoder, start, end, step, profile=False):
+    """Worker: score one shard of the sampling grid with its own capture.
+
+    Returns ``(scores, profile_snapshot)``; the snapshot is None unless ``profile``.
+    """
+    _start_worker_profile(profile)
+    sampler = open_sampler(video_path, scale_factor=scale_factor, decoder=decoder)
+    try:
+        return list(scan_grid(sampler, matcher, start, end, step)), _worker_profile()
+    finally:
+        sampler.release()
+
+
+def _refine_match(video_path, matcher, scale_factor, decoder, threshold, fps, coarse_ts, profile=False):
+    """Worker: run the look-back refinement for one coarse match, returning ``(result, profile_snapshot)``."""
+    _start_worker_profile(profile)
+    sampler = open_sampler(video_path, scale_factor=scale_factor, decoder=decoder)
+    try:
+        return refine_coarse_match(sampler, coarse_ts, fps, matcher, threshold), _worker_profile()
+    finally:
+        sampler.release()
+
+
+def scan_coarse_parallel(video_path, matcher, scale_factor, jump_frames, workers, first_frame=0, decoder="opencv"):
+    """Score the ``jump_frames`` sampling grid of ``video_path`` across a process pool.
+
+    Yields ``(frame_idx, score, loc)`` in frame order for every sample read
+    from ``first_frame`` on, one shard at a time as shards complete. When
+    ``PROFILER`` is on, the workers' stage timings are merged into it.
+    """
+    cap = cv2.VideoCapture(video_path)
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    cap.release()
+
+    keyframes = keyframe_indices(video_path, fps)
+    bounds = shard_bounds(total_frames, workers * SHARDS_PER_WORKER, keyframes, first_frame)
+    shards = []
+    for start, end in bounds:
+        first = -(-start // jump_frames) * jump_frames  # first grid sample in the shard
+        if first < end:
+            shards.append([first, end])
+    # FRAME_COUNT can be approximate: let the last shard read until EOF.
+    if shards:
+        shards[-1][1] = None
+    else:
+        shards.append([-(-first_frame // jump_frames) * jump_frames, None])
+
+    pool = ProcessPoolExecutor(max_workers=workers)
+    try:
+        futures = [
+            pool.submit(
+                _scan_shard, video_path, matcher, scale_factor, decoder, start, end, jump_frames, PROFILER.enabled
+            )
+            for start, end in shards
+        ]
+        for future in futures:
+            scores, profile = future.result()
+            PROFILER.merge(profile)
+            yield from scores
+    finally:
+        # Closing the generator early (e.g. a cancelled run) drops the shards not started yet
+        # and returns without waiting for the running ones.
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def refine_parallel(
+    video_path, matcher, scale_factor, threshold, fps, coarse_matches, workers, decoder="opencv", cancel_event=None
+):
+    """Refine every coarse timestamp in a process pool, returning results in input order.
+
+    Once ``cancel_event`` is set, the results so far are returned at the
+    next completed refinement, without waiting for the others.
+    """
+    pool = ProcessPoolExecutor(max_workers=workers)
+    try:
+        futures = [
+            pool.submit(_refine_match, video_path, matcher, scale_factor, decoder, threshold, fps, ts, PROFILER.enabled)
+            for ts in coarse_matches
+        ]
+        results = []
+        for future in futures:
+            if cancel_event is not None and cancel_event.is_set():
+                break
+            result, profile = future.result()
+            PROFILER.merge(profile)
+            results.append(result)
+        return results
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,192 @@
+import itertools
+import os
+import queue
+import threading
+import time
+
+import cv2
+
+from frame_sampler import open_sampler
+from stage_profiler import PROFILER
+
+# Frames decoded ahead of the matchers, i.e. the size of the frame buffer ring.
+PREFETCH_DEPTH = 8
+# One decoder double-buffers the matchers; extra match threads only pay off with spare cores.
+DECODE_THREADS = 1
+MATCH_THREADS = max(min((os.cpu_count() or 1) - DECODE_THREADS, 2), 1)
+
+_POLL_SECONDS = 0.1
+
+
+def _grid_blocks(video_path, start, end, step, n_blocks):
+    """Split the grid ``start, start + step, ...`` into ``n_blocks`` contiguous iterables of indices."""
+    if n_blocks <= 1:
+        return [range(start, end, step) if end is not None else itertools.count(start, step)]
+    if end is None:
+        cap = cv2.VideoCapture(video_path)
+        end_estimate = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        cap.release()
+    else:
+        end_estimate = end
+    grid = range(start, max(end_estimate, start), step)
+    bounds = [grid[len(grid) * i // n_blocks] for i in range(n_blocks) if len(grid) * i // n_blocks < len(grid)]
+    if not bounds:
+        bounds = [start]
+    blocks = [range(a, b, step) for a, b in zip(bounds, bounds[1:])]
+    # FRAME_COUNT can be approximate: the last block reads until EOF.
+    blocks.append(range(bounds[-1], end, step) if end is not None else itertools.count(bounds[-1], step))
+    return blocks
+
+
+def scan_grid_prefetch(
+    video_path,
+    matcher,
+    scale_factor,
+    start,
+    end,
+    step,
+    decoder="opencv",
+    depth=PREFETCH_DEPTH,
+    decode_threads=1,
+    match_threads=1,
+):
+    """Yield ``(frame_idx, score, loc)`` like ``scan_grid``, with decoding and matching on threads.
+
+    ``decode_threads`` threads each open a sampler and decode a contiguous
+    block of the grid into a ring of ``depth`` frame buffers, allocated once
+    and reused through ``read_gray(..., out=)``. ``match_threads`` threads
+    score the filled buffers and give them back. OpenCV releases the GIL
+    while decoding and matching, so both overlap. Results are re-ordered and
+    yielded in frame order. A stateful matcher (ROI learning, static-frame
+    gating) needs one decode and one match thread so it sees frames in order.
+    """
+    buffers = [None] * depth
+    free = queue.Queue()
+    for slot in range(depth):
+        free.put(slot)
+    filled = queue.Queue()
+    results = queue.Queue()
+    stop = threading.Event()
+    blocks = _grid_blocks(video_path, start, end, step, decode_threads)
+    decoders_left = [len(blocks)]
+    lock = threading.Lock()
+
+    def take_slot():
+        while not stop.is_set():
+            try:
+                return free.get(timeout=_POLL_SECONDS)
+            except queue.Empty:
+                pass
+        return None
+
+    def decode(block):
+        sampler = None
+        try:
+            sampler = open_sampler(video_path, scale_factor=scale_factor, decoder=decoder)
+            for frame_idx in block:
+                slot = take_slot()
+                if slot is None:
+                    return
+                ret, gray = sampler.read_gray(frame_idx, out=buffers[slot])
+                if not ret:
+                    free.put(slot)
+                    results.put(("eof", frame_idx))
+                    return
+                buffers[slot] = gray
+                filled.put((slot, frame_idx))
+        except Exception as e:
+            results.put(("error", e))
+        finally:
+            if sampler is not None:
+                sampler.release()
+            with lock:
+                decoders_left[0] -= 1
+                if decoders_left[0] == 0:
+                    for _ in range(match_threads):
+                        filled.put(None)
+
+    def match():
+        try:
+            while True:
+                item = filled.get()
+                if item is None:
+                    return
+                slot, frame_idx = item
+                t0 = time.perf_counter()
+                max_val, max_loc = matcher.match(buffers[slot])
+                PROFILER.add("match", time.perf_counter() - t0)
+                free.put(slot)
+                results.put(("score", frame_idx, (max_val, max_loc)))
+        except Exception as e:
+            results.put(("error", e))
+        finally:
+            results.put(("done", None))
+
+    threads = [threading.Thread(target=decode, args=(block,), daemon=True) for block in blocks]
+    threads += [threading.Thread(target=match, daemon=True) for _ in range(match_threads)]
+    for thread in threads:
+        thread.start()
+
+    pending = {}
+    eof = end
+    matchers_left = match_threads
+    frame_idx = start
+    try:
+        while eof is None or frame_idx < eof:
+            if frame_idx in pending:
+                max_val, max_loc = pending.pop(frame_idx)
+                yield frame_idx, max_val, max_loc
+                frame_idx += step
+                continue
+            if matchers_left == 0:
+                break
+            kind, value, *rest = results.get()
+            if kind == "score":
+                pending[value] = rest[0]
+            elif kind == "eof":
+                eof = value if eof is None else min(eof, value)
+            elif kind == "error":
+                raise value
+            else:
+                matchers_left -= 1
+    finally:
+        # Also runs when the consumer stops early (e.g. a cancelled run).
+        stop.set()
+        for _ in range(match_threads):
+            filled.put(None)
+        for thread in threads:
+            thread.join()
+
+
+def scan_cooldown_prefetch(
+    video_path,
+    matcher,
+    scale_factor,
+    start,
+    step,
+    threshold,
+    cooldown,
+    decoder="opencv",
+    depth=PREFETCH_DEPTH,
+    decode_threads=1,
+    match_threads=1,
+):
+    """Yield ``(frame_idx, score, loc)`` like ``scan_grid_prefetch``, jumping ``cooldown`` frames after a match.
+
+    After a score of at least ``threshold`` the frames prefetched past it
+    are dropped and the pipeline restarts ``cooldown`` frames later, on the
+    same samples as the sequential coarse pass.
+    """
+    while start is not None:
+        scan = scan_grid_prefetch(
+            video_path, matcher, scale_factor, start, None, step, decoder, depth, decode_threads, match_threads
+        )
+        start = None
+        try:
+            for frame_idx, max_val, max_loc in scan:
+                yield frame_idx, max_val, max_loc
+                if max_val >= threshold:
+                    start = frame_idx + cooldown
+                    break
+        finally:
+            scan.close()
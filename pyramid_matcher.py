@@ -0,0 +1,69 @@
+import cv2
+import numpy as np
+
+# Screening scale relative to the analysis frame, and the coarse score below
+# which a frame is rejected without a full-resolution match.
+COARSE_SCALE = 0.125
+PRE_THRESHOLD = 0.5
+
+# Below this size the coarse template no longer carries the shape.
+_MIN_COARSE_SIDE = 8
+
+
+class PyramidMatcher:
+    """Screen frames at ``coarse_scale`` and verify promising ones at full resolution.
+
+    The full-resolution ``matchTemplate`` only runs in a window around the
+    best coarse location, and only when the coarse score reaches
+    ``pre_threshold``. Rejected frames report their coarse score, so
+    ``pre_threshold`` must stay below the detection threshold.
+    """
+
+    name = "pyramid"
+
+    def __init__(self, template, mask=None, coarse_scale=COARSE_SCALE, pre_threshold=PRE_THRESHOLD):
+        self.template = template
+        self.mask = mask
+        self.coarse_scale = coarse_scale
+        self.pre_threshold = pre_threshold
+
+        h, w = template.shape[:2]
+        self.screening = min(round(w * coarse_scale), round(h * coarse_scale)) >= _MIN_COARSE_SIDE
+        if self.screening:
+            # Same fx/fy call as the frames: an explicit size would map pixels at a slightly different scale.
+            self.coarse_template = self._shrink(template)
+            self.coarse_mask = None
+            if mask is not None:
+                # INTER_AREA keeps thin strokes that INTER_NEAREST would drop.
+                self.coarse_mask = np.where(self._shrink(mask) > 0, 255, 0).astype(np.uint8)
+        # One coarse pixel of uncertainty on each side, plus rounding.
+        self.margin = int(np.ceil(1 / coarse_scale)) + 1
+
+    def _shrink(self, image):
+        return cv2.resize(image, (0, 0), fx=self.coarse_scale, fy=self.coarse_scale, interpolation=cv2.INTER_AREA)
+
+    def _match(self, image, template, mask):
+        res = cv2.matchTemplate(image, template, cv2.TM_CCOEFF_NORMED, mask=mask)
+        _, max_val, _, max_loc = cv2.minMaxLoc(res)
+        return max_val, max_loc
+
+    def match(self, gray):
+        """Return ``(max_val, max_loc)`` of the template in a grayscale frame."""
+        if not self.screening:
+            return self._match(gray, self.template, self.mask)
+
+        small = self._shrink(gray)
+        if small.shape[0] < self.coarse_template.shape[0] or small.shape[1] < self.coarse_template.shape[1]:
+            return self._match(gray, self.template, self.mask)
+        coarse_val, coarse_loc = self._match(small, self.coarse_template, self.coarse_mask)
+        if coarse_val < self.pre_threshold:
+            return coarse_val, (int(coarse_loc[0] / self.coarse_scale), int(coarse_loc[1] / self.coarse_scale))
+
+        h, w = self.template.shape[:2]
+        frame_h, frame_w = gray.shape[:2]
+        x = int(coarse_loc[0] / self.coarse_scale)
+        y = int(coarse_loc[1] / self.coarse_scale)
+        x0, y0 = max(x - self.margin, 0), max(y - self.margin, 0)
+        x1, y1 = min(x + w + self.margin, frame_w), min(y + h + self.margin, frame_h)
+        max_val, (dx, dy) = self._match(gray[y0:y1, x0:x1], self.template, self.mask)
+        return max_val, (x0 + dx, y0 + dy)
@@ -0,0 +1,85 @@
+LEARN_HITS = 2
+ROI_PADDING = 16  # pixels at analysis scale
+RECHECK_EVERY = 30  # ROI misses between two full-frame checks
+
+
+class RoiMatcher:
+    """Wrap a matcher and, once the overlay position is learned, search only around it.
+
+    The first ``learn_hits`` confident matches (score >= ``confident_score``)
+    that agree within ``padding`` pixels fix a region of interest: the
+    template box around their median location, padded by ``padding``. From
+    then on only that region is searched. Every ``recheck_every``
+    consecutive ROI misses a full-frame search runs; if it finds a confident
+    match outside the ROI the overlay has moved and the ROI is learned again.
+    """
+
+    def __init__(self, inner, confident_score, learn_hits=LEARN_HITS, padding=ROI_PADDING, recheck_every=RECHECK_EVERY):
+        self.inner = inner
+        # The learned ROI depends on confident_score: keep it in cache keys.
+        self.name = f"roi{confident_score:g}+{inner.name}"
+        self.mask = inner.mask
+        self.confident_score = confident_score
+        self.learn_hits = learn_hits
+        self.padding = padding
+        self.recheck_every = recheck_every
+
+        self.hits = []
+        self.roi = None
+        self.misses = 0
+        self.roi_searches = 0
+        self.full_searches = 0
+
+    def _learn(self, loc, frame_shape):
+        self.hits.append(loc)
+        if len(self.hits) < self.learn_hits:
+            return
+        xs = sorted(x for x, _ in self.hits)
+        ys = sorted(y for _, y in self.hits)
+        if xs[-1] - xs[0] > self.padding or ys[-1] - ys[0] > self.padding:
+            self.hits.pop(0)
+            return
+
+        x, y = xs[len(xs) // 2], ys[len(ys) // 2]
+        th, tw = self.inner.template.shape[:2]
+        frame_h, frame_w = frame_shape[:2]
+        self.roi = (
+            max(x - self.padding, 0),
+            max(y - self.padding, 0),
+            min(x + tw + self.padding, frame_w),
+            min(y + th + self.padding, frame_h),
+        )
+        self.misses = 0
+
+    def _full_search(self, gray):
+        self.full_searches += 1
+        return self.inner.match(gray)
+
+    def match(self, gray):
+        """Return ``(max_val, max_loc)`` of the template in a grayscale frame."""
+        if self.roi is None:
+            max_val, max_loc = self._full_search(gray)
+            if max_val >= self.confident_score:
+                self._learn(max_loc, gray.shape)
+            return max_val, max_loc
+
+        x0, y0, x1, y1 = self.roi
+        self.roi_searches += 1
+        max_val, (dx, dy) = self.inner.match(gray[y0:y1, x0:x1])
+        max_loc = (x0 + dx, y0 + dy)
+        if max_val >= self.confident_score:
+            self.misses = 0
+            return max_val, max_loc
+
+        self.misses += 1
+        if self.misses >= self.recheck_every:
+            self.misses = 0
+            full_val, full_loc = self._full_search(gray)
+            if full_val >= self.confident_score:
+                # The overlay moved: the ROI no longer holds, learn it again.
+                self.roi = None
+                self.hits = []
+                self._learn(full_loc, gray.shape)
+            if full_val > max_val:
+                return full_val, full_loc
+        return max_val, max_loc
@@ -0,0 +1,100 @@
+import hashlib
+import os
+import struct
+
+import numpy as np
+
+CACHE_DIR = os.path.expanduser("~/.t_detector_cache")
+MAX_CACHE_BYTES = 512 * 1024 * 1024
+
+_MAGIC = b"TSC1"
+_HEADER = struct.Struct("<4sII")  # magic, complete flag, stride
+RECORD_DTYPE = np.dtype([("frame", "<i8"), ("score", "<f4"), ("x", "<i4"), ("y", "<i4")])
+
+
+def video_fingerprint(path, chunk_size=1 << 20):
+    """Hash the size plus the first, middle and last ``chunk_size`` bytes of a video.
+
+    Hashing a multi-GB recording entirely would cost as much as decoding it,
+    and these samples are enough to tell two recordings apart.
+    """
+    size = os.path.getsize(path)
+    digest = hashlib.sha1(str(size).encode())
+    with open(path, "rb") as f:
+        for offset in (0, max(size // 2 - chunk_size // 2, 0), max(size - chunk_size, 0)):
+            f.seek(offset)
+            digest.update(f.read(chunk_size))
+    return digest.hexdigest()
+
+
+def timeline_key(video_path, template_path, mask, scale_factor, stride, backend=""):
+    """Return the cache key of a score timeline computed by matcher ``backend``."""
+    digest = hashlib.sha1(video_fingerprint(video_path).encode())
+    with open(template_path, "rb") as f:
+        digest.update(f.read())
+    digest.update(np.ascontiguousarray(mask).tobytes())
+    digest.update(f"{scale_factor:.6f}:{stride}:{backend}".encode())
+    return digest.hexdigest()
+
+
+def _cache_path(key):
+    return os.path.join(CACHE_DIR, f"{key}.tsc")
+
+
+def load_timeline(key):
+    """Return ``(records, complete)`` for ``key``; records is empty if nothing is cached."""
+    path = _cache_path(key)
+    try:
+        with open(path, "rb") as f:
+            header = f.read(_HEADER.size)
+            data = f.read()
+    except OSError:
+        return np.empty(0, dtype=RECORD_DTYPE), False
+
+    if len(header) < _HEADER.size or header[:4] != _MAGIC:
+        return np.empty(0, dtype=RECORD_DTYPE), False
+    _, complete, _ = _HEADER.unpack(header)
+    usable = len(data) - len(data) % RECORD_DTYPE.itemsize  # drop a torn last record
+    os.utime(path)  # LRU: last use is the mtime
+    return np.frombuffer(data[:usable], dtype=RECORD_DTYPE), bool(complete)
+
+
+class TimelineWriter:
+    """Append score records to the cached timeline of ``key``, resuming after ``n_records``."""
+
+    def __init__(self, key, stride, n_records=0):
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        self.path = _cache_path(key)
+        self.stride = stride
+        mode = "r+b" if n_records and os.path.exists(self.path) else "w+b"
+        self.f = open(self.path, mode)
+        if mode == "w+b":
+            n_records = 0
+            self.f.write(_HEADER.pack(_MAGIC, 0, stride))
+        self.f.truncate(_HEADER.size + n_records * RECORD_DTYPE.itemsize)
+        self.f.seek(0, os.SEEK_END)
+
+    def append(self, frame_idx, score, loc):
+        self.f.write(np.array([(frame_idx, score, loc[0], loc[1])], dtype=RECORD_DTYPE).tobytes())
+
+    def close(self, complete=False):
+        if complete:
+            self.f.seek(0)
+            self.f.write(_HEADER.pack(_MAGIC, 1, self.stride))
+        self.f.close()
+        evict_lru()
+
+
+def evict_lru(max_bytes=MAX_CACHE_BYTES):
+    """Delete the least recently used timelines until the cache fits in ``max_bytes``."""
+    try:
+        entries = [os.path.join(CACHE_DIR, name) for name in os.listdir(CACHE_DIR) if name.endswith(".tsc")]
+    except OSError:
+        return
+    entries.sort(key=os.path.getmtime)
+    total = sum(os.path.getsize(p) for p in entries)
+    for path in entries:
+        if total <= max_bytes:
+            break
+        total -= os.path.getsize(path)
+        os.remove(path)
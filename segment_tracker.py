@@ -0,0 +1,95 @@
+class SegmentTracker:
+    """Turn a stream of ``(timestamp, score)`` samples into appearance segments.
+
+    A segment starts at the first sample scoring at least ``on_threshold``
+    and ends at the first later sample below ``off_threshold``. Segments
+    shorter than ``min_duration`` are dropped, and a segment starting less
+    than ``min_gap`` seconds after the previous one ends is merged into it;
+    like the segments returned, gaps are measured on millisecond-rounded
+    times, so a gap of exactly ``min_gap`` separates.
+    ``push`` returns the segments that can no longer change, as
+    ``(start, duration)``, as soon as no later sample can extend them;
+    ``finish`` returns the rest. Only the open and the last kept segment are
+    held, so memory does not grow with the stream.
+    """
+
+    def __init__(self, on_threshold, off_threshold, min_duration, min_gap):
+        self.on_threshold = on_threshold
+        self.off_threshold = off_threshold
+        self.min_duration = min_duration
+        self.min_gap = min_gap
+        self._run_start = None
+        self._pending = None  # (start, duration) of the last kept segment, which may still be merged
+        self._last_t = None
+
+    def _gap(self, start):
+        pending_start, pending_duration = self._pending
+        return round(start, 3) - (pending_start + pending_duration)
+
+    def _keep(self, start, end, closed):
+        start, duration = round(start, 3), round(end - start, 3)
+        if self._pending is not None and self._gap(start) < self.min_gap:
+            self._pending = (self._pending[0], round(start + duration - self._pending[0], 3))
+            return
+        if self._pending is not None:
+            closed.append(self._pending)
+        self._pending = (start, duration)
+
+    def push(self, t, score):
+        """Add the sample at ``t`` seconds and return the segments finalized by it."""
+        closed = []
+        self._last_t = t
+        if self._run_start is None:
+            if score >= self.on_threshold:
+                self._run_start = t
+        elif score < self.off_threshold:
+            if t - self._run_start >= self.min_duration:
+                self._keep(self._run_start, t, closed)
+            self._run_start = None
+
+        # A later segment cannot start before the open run (or, without one, before t).
+        earliest_start = t if self._run_start is None else self._run_start
+        if self._pending is not None and self._gap(earliest_start) >= self.min_gap:
+            closed.append(self._pending)
+            self._pending = None
+        return closed
+
+    def finish(self):
+        """Close a segment still open at the last sample and return the remaining segments."""
+        closed = []
+        if self._run_start is not None and self._last_t - self._run_start >= self.min_duration:
+            self._keep(self._run_start, self._last_t, closed)
+        self._run_start = None
+        if self._pending is not None:
+            closed.append(self._pending)
+            self._pending = None
+        return closed
+
+
+class DecimatedCurve:
+    """Keep a bounded ``(timestamp, score)`` curve of a stream, for plotting.
+
+    Each point covers ``bucket`` consecutive samples and holds the first
+    timestamp and the highest score, so peaks survive. When ``max_points``
+    points are full, neighbours are merged in pairs and ``bucket`` doubles.
+    """
+
+    def __init__(self, max_points):
+        self.max_points = max(max_points // 2 * 2, 2)
+        self.bucket = 1
+        self.points = []
+        self._last_count = 0
+
+    def push(self, t, score):
+        """Add the sample at ``t`` seconds."""
+        if self.points and self._last_count < self.bucket:
+            start, best = self.points[-1]
+            self.points[-1] = (start, max(best, score))
+            self._last_count += 1
+            return
+        if len(self.points) == self.max_points:
+            pairs = zip(self.points[::2], self.points[1::2])
+            self.points = [(a[0], max(a[1], b[1])) for a, b in pairs]
+            self.bucket *= 2
+        self.points.append((t, score))
+        self._last_count = 1
@@ -0,0 +1,131 @@
+import json
+import os
+import threading
+import time
+
+import numpy as np
+
+# Histogram bucket upper bounds in milliseconds (the last bucket is open-ended).
+HISTOGRAM_BOUNDS_MS = [0.1, 1, 10, 100, 1000]
+
+
+class _NullStage:
+    """Context manager returned while profiling is off: does nothing."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+class _StageTimer:
+    def __init__(self, samples):
+        self.samples = samples
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.samples.append(time.perf_counter() - self.start)
+        return False
+
+
+class StageProfiler:
+    """Collect per-stage wall-clock samples (seek, decode, gray, resize, match...).
+
+    ``with profiler.stage("decode"):`` records one sample per call. While
+    ``enabled`` is False, ``stage`` returns a shared no-op context manager
+    and ``count``/``add`` return at once, so the hooks can stay in hot loops.
+    """
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.samples = {}
+        self.counters = {}
+        self._timers = {}
+
+    def stage(self, name):
+        if not self.enabled:
+            return _NULL_STAGE
+        # One timer per thread: pipelined decode and match threads time the same stages.
+        key = (name, threading.get_ident())
+        timer = self._timers.get(key)
+        if timer is None:
+            timer = self._timers[key] = _StageTimer(self.samples.setdefault(name, []))
+        return timer
+
+    def add(self, name, seconds, frames=1):
+        """Record ``seconds`` spent on ``frames`` frames at once (e.g. a batch) as per-frame samples."""
+        if self.enabled and frames > 0:
+            self.samples.setdefault(name, []).extend([seconds / frames] * frames)
+
+    def count(self, name, n=1):
+        if self.enabled:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def reset(self):
+        self.samples.clear()
+        self.counters.clear()
+        self._timers.clear()
+
+    def snapshot(self):
+        """Return the collected data as plain containers, e.g. to send back from a worker process."""
+        return {"samples": {k: list(v) for k, v in self.samples.items()}, "counters": dict(self.counters)}
+
+    def merge(self, snapshot):
+        if not snapshot:
+            return
+        for name, values in snapshot["samples"].items():
+            self.samples.setdefault(name, []).extend(values)
+        for name, n in snapshot["counters"].items():
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def summary(self):
+        """Return ``{stage: {calls, total_s, mean_ms, p95_ms, histogram}}``, slowest stage first."""
+        stages = {}
+        for name, values in self.samples.items():
+            if not values:
+                continue
+            ms = np.asarray(values) * 1000
+            bins = np.searchsorted(HISTOGRAM_BOUNDS_MS, ms)
+            stages[name] = {
+                "calls": len(values),
+                "total_s": float(ms.sum() / 1000),
+                "mean_ms": float(ms.mean()),
+                "p95_ms": float(np.percentile(ms, 95)),
+                "histogram": np.bincount(bins, minlength=len(HISTOGRAM_BOUNDS_MS) + 1).tolist(),
+            }
+        return dict(sorted(stages.items(), key=lambda item: -item[1]["total_s"]))
+
+    def report(self, log_callback=print, path=None):
+        """Log the per-stage breakdown and, with ``path``, write it as JSON. No-op when off."""
+        if not self.enabled:
+            return None
+        stages = self.summary()
+        log_callback("\n⏱ Profil par étape (total / moyenne / p95 par appel) :")
+        for name, s in stages.items():
+            log_callback(
+                f"   {name:<12} {s['total_s']:8.2f}s  {s['mean_ms']:8.2f} ms  {s['p95_ms']:8.2f} ms  ×{s['calls']}"
+            )
+        for name, n in sorted(self.counters.items()):
+            log_callback(f"   {name:<12} {n}")
+
+        if path:
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(
+                    {"histogram_bounds_ms": HISTOGRAM_BOUNDS_MS, "stages": stages, "counters": self.counters},
+                    f,
+                    indent=2,
+                )
+            log_callback(f"📄 Profil enregistré dans {path}")
+        return stages
+
+
+# Shared by the samplers, matchers and detector scripts; T_DETECTOR_PROFILE=1 turns it on at start-up.
+PROFILER = StageProfiler(enabled=os.environ.get("T_DETECTOR_PROFILE") == "1")
@@ -0,0 +1,457 @@
+import json
+import os
+import subprocess
+import sys
+import time
+
+import cv2
+import numpy as np
+from PIL import Image, ImageDraw
+
+from frame_gate import GatedMatcher
+from integral_matcher import IntegralTMatcher
+from frame_sampler import open_sampler
+from parallel_scan import apply_cooldown, refine_parallel, scan_coarse_parallel
+from prefetch_scan import DECODE_THREADS, MATCH_THREADS, scan_cooldown_prefetch, scan_grid_prefetch
+from roi_matcher import RoiMatcher
+from score_cache import TimelineWriter, load_timeline, timeline_key
+from stage_profiler import PROFILER
+from t_matching import COOLDOWN_SECONDS, LOOKBACK_SECONDS, refine_coarse_match, scan_cooldown, scan_grid
+from template_bank import load_t_matcher
+
+output_path = os.path.expanduser("~/Documents/refined_t_timestamps.txt")
+
+# Generated template banks: crop half-size and search margin around the T junction, in bar thicknesses.
+CROP_HALF_CELLS = 4
+SEARCH_MARGIN_CELLS = 4
+# Largest coarse stride of the adaptive pass: shorter T appearances may be skipped.
+ADAPTIVE_MAX_SECONDS = 4
+
+
+class DetectionCancelled(Exception):
+    """Raised inside ``detect_coarse_and_refined`` when its ``cancel_event`` is set."""
+
+
+def _check_cancelled(cancel_event):
+    if cancel_event is not None and cancel_event.is_set():
+        raise DetectionCancelled()
+
+
+def open_results_file(path, log_callback):
+    """Try to open the results file with the default system application."""
+    try:
+        if os.name == "nt":
+            os.startfile(path)
+        elif sys.platform == "darwin":
+            subprocess.Popen(["open", path])
+        else:
+            subprocess.Popen(["xdg-open", path])
+        log_callback(f"📂 Ouverture du fichier : {path}")
+    except Exception as e:
+        log_callback(f"⚠️ Impossible d'ouvrir automatiquement le fichier : {e}")
+
+
+def t_rectangles(width, height, y_ratio=0.75, thickness_ratio=0.01):
+    """Return the bar and stem of the T as inclusive ``[(x0, y0), (x1, y1)]`` rectangles."""
+    thickness = int(width * thickness_ratio)
+    y_bar = int(height * y_ratio)
+    x_center = width // 2
+    bar = [(0, y_bar - thickness // 2), (width, y_bar + thickness // 2)]
+    stem = [(x_center - thickness // 2, 0), (x_center + thickness // 2, y_bar)]
+    return bar, stem
+
+
+def generate_t_template_from_video(video_path, output_path="t_template_generated.png", y_ratio=0.75):
+    """Generate a black T template from the first frame of a video."""
+    cap = cv2.VideoCapture(video_path)
+    success, frame = cap.read()
+    cap.release()
+
+    if not success:
+        raise ValueError(f"Impossible de lire la vidéo : {video_path}")
+
+    height, width = frame.shape[:2]
+
+    img = Image.new("RGBA", (width, height), (255, 255, 255, 0))
+    draw = ImageDraw.Draw(img)
+
+    for rect in t_rectangles(width, height, y_ratio):
+        draw.rectangle(rect, fill=(0, 0, 0, 255))
+
+    img.save(output_path)
+    print(f"✅ Template T généré : {output_path}")
+    return output_path
+
+
+def generate_t_template_bank(
+    video_path, output_path="t_template_bank.json", y_ratios=(0.75,), thickness_ratios=(0.01,), threshold=0.75
+):
+    """Write cropped T templates, one per ``y_ratio`` x ``thickness_ratio``, and their bank file.
+
+    Each template is the square of ``2 * CROP_HALF_CELLS`` bar thicknesses
+    around the junction of the bar and the stem. Its mask covers the T plus
+    a ring of background one thickness wide, so the masked correlation has
+    contrast. The bank records where each crop sits in the frame and
+    searches ``SEARCH_MARGIN_CELLS`` thicknesses around it (see
+    ``template_bank``).
+    """
+    cap = cv2.VideoCapture(video_path)
+    success, frame = cap.read()
+    cap.release()
+
+    if not success:
+        raise ValueError(f"Impossible de lire la vidéo : {video_path}")
+
+    height, width = frame.shape[:2]
+    base = os.path.splitext(os.path.abspath(output_path))[0]
+    entries = []
+    for y_ratio in y_ratios:
+        for thickness_ratio in thickness_ratios:
+            canvas = np.full((height, width), 255, np.uint8)
+            for (x0, y0), (x1, y1) in t_rectangles(width, height, y_ratio, thickness_ratio):
+                canvas[y0:y1 + 1, x0:x1 + 1] = 0
+
+            thickness = max(int(width * thickness_ratio), 1)
+            half = CROP_HALF_CELLS * thickness
+            x_center, y_bar = width // 2, int(height * y_ratio)
+            x0, y0 = max(x_center - half, 0), max(y_bar - half, 0)
+            crop = canvas[y0:min(y_bar + half, height), x0:min(x_center + half, width)]
+            ring = np.ones((2 * thickness + 1, 2 * thickness + 1), np.uint8)
+            mask = cv2.dilate(np.where(crop == 0, 255, 0).astype(np.uint8), ring)
+
+            name = f"t_y{round(y_ratio * 100)}_e{thickness}"
+            template_file, mask_file = f"{base}_{name}.png", f"{base}_{name}_mask.png"
+            cv2.imwrite(template_file, crop)
+            cv2.imwrite(mask_file, mask)
+            entries.append({
+                "name": name,
+                "template": template_file,
+                "mask": mask_file,
+                "threshold": threshold,
+                "x0": x0,
+                "y0": y0,
+                "margin": SEARCH_MARGIN_CELLS * thickness,
+                "y_ratio": y_ratio,
+                "thickness": thickness,
+            })
+
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump(entries, f, indent=2)
+    print(f"✅ Banque de {len(entries)} templates T générée : {output_path}")
+    return output_path
+
+def _inner_matchers(matcher):
+    """Yield ``matcher`` and every matcher it wraps (``inner``, bank ``matchers``)."""
+    yield matcher
+    for inner in getattr(matcher, "matchers", [getattr(matcher, "inner", None)]):
+        if inner is not None:
+            yield from _inner_matchers(inner)
+
+
+def score_timeline(
+    video_path,
+    template_path,
+    matcher,
+    scale_factor,
+    decoder,
+    jump_frames,
+    workers,
+    use_cache,
+    log_callback,
+    prefetch=0,
+    decode_threads=1,
+    match_threads=1,
+):
+    """Yield ``(frame_idx, score, loc)`` for every sample of the ``jump_frames`` grid.
+
+    With ``use_cache`` the timeline is read from and appended to the score
+    cache, so a re-run only re-applies the threshold and an interrupted (or
+    cancelled, i.e. closed) scan resumes where it stopped.
+    """
+    writer = None
+    first_frame = 0
+    if use_cache:
+        key = timeline_key(
+            video_path, template_path, matcher.mask, scale_factor, jump_frames, f"{matcher.name}/{decoder}"
+        )
+        cached, complete = load_timeline(key)
+        scores = [(int(r["frame"]), float(r["score"]), (int(r["x"]), int(r["y"]))) for r in cached]
+        if complete:
+            log_callback(f"💾 Scores lus depuis le cache ({len(scores)} échantillons)")
+            yield from scores
+            return
+        if scores:
+            first_frame = scores[-1][0] + jump_frames
+            log_callback(f"💾 Reprise du scan à la frame {first_frame} ({len(scores)} échantillons en cache)")
+        yield from scores
+        writer = TimelineWriter(key, jump_frames, len(scores))
+
+    sampler = None
+    if workers > 1:
+        new_scores = scan_coarse_parallel(
+            video_path, matcher, scale_factor, jump_frames, workers, first_frame, decoder
+        )
+    elif prefetch:
+        new_scores = scan_grid_prefetch(
+            video_path,
+            matcher,
+            scale_factor,
+            first_frame,
+            None,
+            jump_frames,
+            decoder,
+            depth=prefetch,
+            decode_threads=decode_threads,
+            match_threads=match_threads,
+        )
+    else:
+        sampler = open_sampler(video_path, scale_factor=scale_factor, decoder=decoder)
+        new_scores = scan_grid(sampler, matcher, first_frame, None, jump_frames)
+
+    complete = False
+    try:
+        for record in new_scores:
+            if writer:
+                writer.append(*record)
+            yield record
+        complete = True
+    finally:
+        new_scores.close()
+        if sampler:
+            sampler.release()
+        if writer:
+            writer.close(complete=complete)
+
+
+def coarse_plan(workers, use_cache, prefetch, adaptive_stride):
+    """Return ``(source, prefetch, adaptive_stride, ignored)`` for these coarse pass options.
+
+    ``source`` is "timeline" when the whole 1 s grid is scored (``use_cache``
+    or ``workers > 1``) and the cooldown applied afterwards, "prefetch" for
+    the prefetching single process scan, else "sequential". ``ignored``
+    names the options the chosen source cannot honour: the adaptive stride
+    with a fixed grid, and prefetching with several processes or with the
+    adaptive stride, whose next frame depends on the last score.
+    """
+    ignored = []
+    if adaptive_stride and (workers > 1 or use_cache):
+        ignored.append("adaptive_stride")
+        adaptive_stride = False
+    if prefetch and (adaptive_stride or workers > 1):
+        ignored.append("prefetch")
+        prefetch = 0
+    if workers > 1 or use_cache:
+        source = "timeline"
+    elif prefetch:
+        source = "prefetch"
+    else:
+        source = "sequential"
+    return source, prefetch, adaptive_stride, ignored
+
+
+def _sequential_samples(video_path, matcher, scale_factor, decoder, step, threshold, cooldown, max_step):
+    sampler = open_sampler(video_path, scale_factor=scale_factor, decoder=decoder)
+    try:
+        yield from scan_cooldown(sampler, matcher, 0, step, threshold, cooldown, max_step)
+    finally:
+        sampler.release()
+
+
+def detect_coarse_and_refined(
+    video_path,
+    template_path,
+    threshold,
+    scale_factor,
+    log_callback,
+    workers=1,
+    use_cache=False,
+    backend="matchTemplate",
+    learn_roi=False,
+    decoder="opencv",
+    gate_diff=0,
+    results_path=None,
+    open_results=True,
+    profile=False,
+    timeline_callback=None,
+    progress_callback=None,
+    cancel_event=None,
+    adaptive_stride=False,
+    prefetch=0,
+):
+    """Detect T onsets in ``video_path``, write them to ``results_path`` and return ``[(seconds, score), ...]``.
+
+    With ``profile`` the time spent per stage (seek, decode, gray, resize,
+    match...) is logged at the end and written next to ``results_path``.
+    ``timeline_callback`` receives the ``(frame_idx, score, loc)`` coarse
+    timeline when the whole grid is scored (``workers > 1`` or ``use_cache``).
+    ``progress_callback(phase, done, total)`` reports the coarse pass in
+    frames and the refinement in matches. Setting ``cancel_event`` (a
+    ``threading.Event``) stops the run with ``DetectionCancelled``.
+    With ``adaptive_stride`` the sequential coarse pass jumps up to
+    ``ADAPTIVE_MAX_SECONDS`` while the score stays far below ``threshold``;
+    onsets are still located frame-exactly by the refinement. It is ignored
+    (and logged) with ``use_cache`` or ``workers > 1``, which score the
+    whole fixed grid.
+    With ``prefetch`` (a number of frames) and a single process, the coarse
+    frames are decoded that far ahead on a thread while others match them;
+    it is ignored with ``adaptive_stride``, whose next frame depends on the
+    last score. ``coarse_plan`` resolves these combinations.
+    """
+    results_path = results_path or output_path
+    PROFILER.enabled = profile
+    PROFILER.reset()
+    cap = cv2.VideoCapture(video_path)
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    cap.release()
+    matcher = load_t_matcher(template_path, scale_factor, backend)
+    if learn_roi and template_path.lower().endswith(".json"):
+        log_callback("🔲 Banque de templates : la zone de recherche est déjà fixée, recherche ROI ignorée")
+        learn_roi = False
+    if learn_roi:
+        matcher = RoiMatcher(matcher, confident_score=threshold)
+    # Static-frame gating only for the coarse scan: the refinement needs every score.
+    scan_matcher = GatedMatcher(matcher, gate_diff) if gate_diff > 0 else matcher
+
+    jump_frames = int(1 * fps)  # 30s
+    cooldown_frames = int(COOLDOWN_SECONDS * fps)  # skip 2 min after match
+
+    coarse_matches = []
+    start_time = time.time()
+
+    def report(phase, done, total):
+        if progress_callback:
+            progress_callback(phase, done, total)
+
+    # ROI learning and gating depend on frame order: one decode and one match thread then.
+    stateful = learn_roi or gate_diff > 0
+    decode_threads, match_threads = (1, 1) if stateful else (DECODE_THREADS, MATCH_THREADS)
+    source, prefetch, adaptive_stride, ignored = coarse_plan(workers, use_cache, prefetch, adaptive_stride)
+    if "adaptive_stride" in ignored:
+        log_callback("🔢 Pas adaptatif ignoré : le cache et les processus parallèles notent toute la grille de 1s")
+    if "prefetch" in ignored:
+        log_callback("📥 Préchargement ignoré avec les sauts adaptatifs ou plusieurs processus")
+
+    if source == "timeline":
+        samples = score_timeline(
+            video_path,
+            template_path,
+            scan_matcher,
+            scale_factor,
+            decoder,
+            jump_frames,
+            workers,
+            use_cache,
+            log_callback,
+            prefetch=prefetch,
+            decode_threads=decode_threads,
+            match_threads=match_threads,
+        )
+    elif source == "prefetch":
+        samples = scan_cooldown_prefetch(
+            video_path,
+            scan_matcher,
+            scale_factor,
+            0,
+            jump_frames,
+            threshold,
+            cooldown_frames,
+            decoder,
+            depth=prefetch,
+            decode_threads=decode_threads,
+            match_threads=match_threads,
+        )
+    else:
+        max_step = int(ADAPTIVE_MAX_SECONDS * fps) if adaptive_stride else None
+        samples = _sequential_samples(
+            video_path, scan_matcher, scale_factor, decoder, jump_frames, threshold, cooldown_frames, max_step
+        )
+
+    if workers > 1:
+        suffix = f" sur {workers} processus"
+    elif prefetch:
+        suffix = f" ({decode_threads}+{match_threads} threads, {prefetch} frames d'avance)"
+    else:
+        suffix = ""
+    if adaptive_stride:
+        log_callback(f"⏱ Première passe : détection rapide avec sauts adaptatifs de 1 à {ADAPTIVE_MAX_SECONDS}s...\n")
+    else:
+        log_callback(f"⏱ Première passe : détection rapide avec sauts de 1s{suffix}...\n")
+
+    # Every source yields its samples in frame order; the timeline scores the cooldowns too, the
+    # others skip them, so the cooldown filter only drops matches for the former.
+    timeline = []
+
+    def observed():
+        for record in samples:
+            _check_cancelled(cancel_event)
+            report("coarse", record[0], total_frames)
+            timeline.append(record)
+            yield record
+
+    try:
+        for frame_idx, max_val in apply_cooldown(observed(), threshold, cooldown_frames):
+            ts = frame_idx / fps
+            coarse_matches.append(ts)
+            log_callback(f"✅ Match détecté à {ts:.2f}s (score={max_val:.3f}) → saut de 2min")
+    finally:
+        samples.close()
+    log_callback(f"🔢 {len(timeline)} frames analysées sur {total_frames}")
+    if timeline_callback and source == "timeline":
+        timeline_callback(timeline)
+    if learn_roi and workers <= 1:
+        log_callback(
+            f"🔲 Recherche ROI : {matcher.roi_searches} frames, plein cadre : {matcher.full_searches} frames "
+            f"(ROI={matcher.roi})"
+        )
+    if gate_diff > 0 and workers <= 1:
+        log_callback(
+            f"⏭ Frames statiques ignorées : {scan_matcher.skipped}/{scan_matcher.scored + scan_matcher.skipped} "
+            f"({scan_matcher.skip_ratio():.0%}, écart max={gate_diff})"
+        )
+    checked = [m for m in _inner_matchers(matcher) if isinstance(m, IntegralTMatcher)]
+    if checked and workers <= 1:
+        log_callback(
+            f"🧮 Contrôle rectangles/matchTemplate : {sum(m.checks for m in checked)} frames comparées, "
+            f"{sum(m.disagreements for m in checked)} désaccords "
+            f"(écart max={max(m.max_score_diff for m in checked):.4f})"
+        )
+    log_callback(f"\n⏱ Fin première passe ({time.time() - start_time:.1f}s). Matches bruts : {len(coarse_matches)}\n")
+
+    refined_matches = []
+    log_callback("🔍 Deuxième passe : recherche précise de chaque début d'apparition...\n")
+
+    report("refine", 0, len(coarse_matches))
+    if workers > 1:
+        refined = refine_parallel(
+            video_path, matcher, scale_factor, threshold, fps, coarse_matches, workers, decoder, cancel_event
+        )
+        _check_cancelled(cancel_event)
+    else:
+        sampler = open_sampler(video_path, scale_factor=scale_factor, decoder=decoder)
+        refined = []
+        try:
+            for ts in coarse_matches:
+                _check_cancelled(cancel_event)
+                refined.append(refine_coarse_match(sampler, ts, fps, matcher, threshold))
+                report("refine", len(refined), len(coarse_matches))
+        finally:
+            sampler.release()
+
+    for coarse_ts, (best_frame, best_score) in zip(coarse_matches, refined):
+        start_ts = max(coarse_ts - LOOKBACK_SECONDS, 0)
+        log_callback(f"\n📍 Recherche entre {start_ts:.2f}s et {coarse_ts:.2f}s...")
+        if best_frame >= 0:
+            refined_ts = best_frame / fps
+            refined_matches.append((refined_ts, best_score))
+            log_callback(f"🎯 Match précis à {refined_ts:.3f}s (score={best_score:.3f})")
+
+    with open(results_path, "w") as f:
+        for t, _ in refined_matches:
+            f.write(f"{t:.3f}\n")
+
+    log_callback(f"\n✅ Détection terminée. Résultats enregistrés dans {os.path.basename(results_path)}")
+    PROFILER.report(log_callback, os.path.splitext(results_path)[0] + "_profile.json")
+    if open_results:
+        open_results_file(results_path, log_callback)
+    return refined_matches
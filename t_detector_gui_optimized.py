@@ -1,163 +1,47 @@
-
-import cv2
-import numpy as np
 import tkinter as tk
 from tkinter import filedialog, ttk
 import threading
-import time
 import os
-import subprocess
-import sys
-from PIL import Image, ImageDraw
 
-output_path = os.path.expanduser("~/Documents/refined_t_timestamps.txt")
+from frame_sampler import DECODERS
+from log_channel import LogChannel
+from prefetch_scan import PREFETCH_DEPTH
+from stage_profiler import PROFILER
+from t_detector import (
+    ADAPTIVE_MAX_SECONDS,
+    DetectionCancelled,
+    detect_coarse_and_refined,
+    generate_t_template_bank,
+)
+from t_matching import MATCHER_BACKENDS
+
 _MASK_STORE = os.path.expanduser("~/.t_detector_last_mask.txt")
 
+# The GUI drains the log channel every LOG_DRAIN_MS and keeps at most MAX_LOG_LINES lines.
+LOG_DRAIN_MS = 100
+MAX_LOG_LINES = 2000
+PHASE_LABELS = {"coarse": "Première passe", "refine": "Raffinage"}
+PHASE_UNITS = {"coarse": "frames", "refine": "matches"}
 
-def open_results_file(path, log_callback):
-    """Try to open the results file with the default system application."""
-    try:
-        if os.name == "nt":
-            os.startfile(path)
-        elif sys.platform == "darwin":
-            subprocess.Popen(["open", path])
-        else:
-            subprocess.Popen(["xdg-open", path])
-        log_callback(f"📂 Ouverture du fichier : {path}")
-    except Exception as e:
-        log_callback(f"⚠️ Impossible d'ouvrir automatiquement le fichier : {e}")
-
-
-def generate_t_template_from_video(video_path, output_path="t_template_generated.png", y_ratio=0.75):
-    """Generate a black T template from the first frame of a video."""
-    cap = cv2.VideoCapture(video_path)
-    success, frame = cap.read()
-    cap.release()
-
-    if not success:
-        raise ValueError(f"Impossible de lire la vidéo : {video_path}")
-
-    height, width = frame.shape[:2]
-    thickness = int(width * 0.01)
-    y_bar = int(height * y_ratio)
-    x_center = width // 2
-
-    img = Image.new("RGBA", (width, height), (255, 255, 255, 0))
-    draw = ImageDraw.Draw(img)
-
-    draw.rectangle(
-        [(0, y_bar - thickness // 2), (width, y_bar + thickness // 2)],
-        fill=(0, 0, 0, 255),
-    )
-
-    draw.rectangle(
-        [(x_center - thickness // 2, 0), (x_center + thickness // 2, y_bar)],
-        fill=(0, 0, 0, 255),
-    )
 
-    img.save(output_path)
-    print(f"✅ Template T généré : {output_path}")
-    return output_path
-
-def detect_coarse_and_refined(video_path, template_path, threshold, scale_factor, log_callback):
-    cap = cv2.VideoCapture(video_path)
-    fps = cap.get(cv2.CAP_PROP_FPS)
-    template_orig = cv2.imread(template_path, cv2.IMREAD_GRAYSCALE)
-    _, mask_orig = cv2.threshold(template_orig, 250, 255, cv2.THRESH_BINARY_INV)
-
-    if scale_factor != 1.0:
-        template = cv2.resize(template_orig, (0, 0), fx=scale_factor, fy=scale_factor)
-        mask = cv2.resize(mask_orig, (0, 0), fx=scale_factor, fy=scale_factor, interpolation=cv2.INTER_NEAREST)
-    else:
-        template = template_orig
-        mask = mask_orig
-
-    w, h = template.shape[::-1]
-    jump_frames = int(1 * fps)  # 30s
-    cooldown_frames = int(120 * fps)  # skip 2 min after match
-
-    coarse_matches = []
-    frame_idx = 0
-    start_time = time.time()
-
-    log_callback("⏱ Première passe : détection rapide avec sauts de 1s...\n")
-    while True:
-        cap.set(cv2.CAP_PROP_POS_FRAMES, frame_idx)
-        ret, frame = cap.read()
-        if not ret:
-            break
-
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        if scale_factor != 1.0:
-            gray = cv2.resize(gray, (0, 0), fx=scale_factor, fy=scale_factor)
-
-        res = cv2.matchTemplate(gray, template, cv2.TM_CCOEFF_NORMED, mask=mask)
-        _, max_val, _, _ = cv2.minMaxLoc(res)
-
-        if max_val >= threshold:
-            ts = frame_idx / fps
-            coarse_matches.append(ts)
-            log_callback(f"✅ Match détecté à {ts:.2f}s (score={max_val:.3f}) → saut de 2min")
-            frame_idx += cooldown_frames
-        else:
-            frame_idx += jump_frames
-
-    cap.release()
-    log_callback(f"\n⏱ Fin première passe ({time.time() - start_time:.1f}s). Matches bruts : {len(coarse_matches)}\n")
-
-    cap = cv2.VideoCapture(video_path)
-    refined_matches = []
-    log_callback("🔍 Deuxième passe : recherche précise de chaque début d'apparition...\n")
-
-    for coarse_ts in coarse_matches:
-        start_frame = int((coarse_ts - 180) * fps)
-        end_frame = int(coarse_ts * fps)
-        start_frame = max(start_frame, 0)
-
-        best_score = -1
-        best_frame = -1
-        step = int(fps)  # 1s
-        log_callback(f"\n📍 Recherche entre {start_frame/fps:.2f}s et {end_frame/fps:.2f}s...")
-
-        for f in range(start_frame, end_frame, step):
-            cap.set(cv2.CAP_PROP_POS_FRAMES, f)
-            ret, frame = cap.read()
-            if not ret:
-                break
-            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-            if scale_factor != 1.0:
-                gray = cv2.resize(gray, (0, 0), fx=scale_factor, fy=scale_factor)
-
-            res = cv2.matchTemplate(gray, template, cv2.TM_CCOEFF_NORMED, mask=mask)
-            _, max_val, _, _ = cv2.minMaxLoc(res)
-
-            if max_val >= threshold and (best_score < 0 or max_val > best_score):
-                best_score = max_val
-                best_frame = f
-
-        if best_frame >= 0:
-            refined_ts = best_frame / fps
-            refined_matches.append(refined_ts)
-            log_callback(f"🎯 Match précis à {refined_ts:.2f}s (score={best_score:.3f})")
-
-    cap.release()
-
-    with open(output_path, "w") as f:
-        for t in refined_matches:
-            f.write(f"{t:.3f}\n")
-
-    log_callback(f"\n✅ Détection terminée. Résultats enregistrés dans refined_t_timestamps.txt")
-    open_results_file(output_path, log_callback)
+def run_gui():
+    # The cache and the parallel processes score the whole fixed 1 s grid: no adaptive stride with them.
+    def adaptive_toggled():
+        if adaptive_var.get():
+            cache_var.set(False)
+            workers_var.set(1)
 
+    def fixed_grid_changed():
+        if cache_var.get() or workers_var.get() > 1:
+            adaptive_var.set(False)
 
-def run_gui():
     def browse_video():
         path = filedialog.askopenfilename(filetypes=[("Video files", "*.mp4 *.avi *.mov")])
         if path:
             video_path.set(path)
 
     def browse_template():
-        path = filedialog.askopenfilename(filetypes=[("PNG files", "*.png")])
+        path = filedialog.askopenfilename(filetypes=[("T templates", "*.png *.json")])
         if path:
             template_path.set(path)
             try:
@@ -172,7 +56,7 @@ def run_gui():
             log_callback("⚠️ Sélectionnez d'abord une vidéo")
             return
         try:
-            out = generate_t_template_from_video(path)
+            out = generate_t_template_bank(path)
             template_path.set(out)
             try:
                 with open(_MASK_STORE, "w") as f:
@@ -185,27 +69,92 @@ def run_gui():
 
     def launch_detection():
         detect_button.config(state=tk.DISABLED)
+        cancel_button.config(state=tk.NORMAL)
+        progress_bar["value"] = 0
+        progress_label.config(text="")
         log_text.delete(1.0, tk.END)
         log_callback("🔄 Lancement de la détection...\n")
         threshold = threshold_slider.get()
         scale_val = scale_var.get()
         scale_factor = {"1x": 1.0, "1/2": 0.5, "1/4": 0.25, "1/8": 0.125}[scale_val]
+        workers = workers_var.get()
+        use_cache = cache_var.get()
+        backend = backend_var.get()
+        learn_roi = roi_var.get()
+        decoder = decoder_var.get()
+        gate_diff = gate_var.get()
+        profile = profile_var.get()
+        adaptive = adaptive_var.get()
+        prefetch = prefetch_var.get()
+        video, template = video_path.get(), template_path.get()
+        cancel_event = threading.Event()
+        channel.reset_progress()
 
         def run_detection():
-            detect_coarse_and_refined(
-                video_path.get(),
-                template_path.get(),
-                threshold,
-                scale_factor,
-                log_callback,
-            )
-            root.after(0, lambda: detect_button.config(state=tk.NORMAL))
-
-        threading.Thread(target=run_detection, daemon=True).start()
+            # Runs off the Tk thread: it only talks to the UI through the channel.
+            try:
+                detect_coarse_and_refined(
+                    video,
+                    template,
+                    threshold,
+                    scale_factor,
+                    channel.log,
+                    workers=workers,
+                    use_cache=use_cache,
+                    backend=backend,
+                    learn_roi=learn_roi,
+                    decoder=decoder,
+                    gate_diff=gate_diff,
+                    profile=profile,
+                    progress_callback=channel.progress,
+                    cancel_event=cancel_event,
+                    adaptive_stride=adaptive,
+                    prefetch=prefetch,
+                )
+            except DetectionCancelled:
+                channel.log("⏹ Détection annulée")
+            except Exception as e:
+                channel.log(f"⚠️ Erreur pendant la détection : {e}")
+
+        running["cancel"] = cancel_event
+        running["thread"] = threading.Thread(target=run_detection, daemon=True)
+        running["thread"].start()
+
+    def cancel_detection():
+        if running["cancel"] is not None:
+            running["cancel"].set()
+            cancel_button.config(state=tk.DISABLED)
+            log_callback("⏹ Annulation demandée...")
 
     def log_callback(msg):
-        log_text.insert(tk.END, msg + "\n")
-        log_text.see(tk.END)
+        channel.log(msg)
+
+    def drain_channel():
+        lines, progress = channel.drain()
+        if lines:
+            log_text.insert(tk.END, "\n".join(lines) + "\n")
+            n_lines = int(log_text.index("end-1c").split(".")[0])
+            if n_lines > MAX_LOG_LINES:
+                log_text.delete("1.0", f"{n_lines - MAX_LOG_LINES + 1}.0")
+            log_text.see(tk.END)
+
+        if progress:
+            phase, fraction, rate, eta = progress
+            progress_bar["value"] = fraction * 100
+            text = f"{PHASE_LABELS.get(phase, phase)} : {fraction:.0%}"
+            if rate:
+                minutes, seconds = divmod(int(eta), 60)
+                text += f" — {rate:.0f} {PHASE_UNITS.get(phase, '')}/s — reste {minutes}:{seconds:02d}"
+            progress_label.config(text=text)
+
+        if running["thread"] is not None and not running["thread"].is_alive():
+            running["thread"] = running["cancel"] = None
+            detect_button.config(state=tk.NORMAL)
+            cancel_button.config(state=tk.DISABLED)
+        root.after(LOG_DRAIN_MS, drain_channel)
+
+    channel = LogChannel()
+    running = {"thread": None, "cancel": None}
 
     root = tk.Tk()
     root.title("Optimized Inverted T Detection")
@@ -227,7 +176,7 @@ def run_gui():
     ttk.Entry(root, textvariable=video_path, width=60).pack(padx=10)
     ttk.Button(root, text="Browse", command=browse_video).pack(pady=2)
 
-    ttk.Label(root, text="🖼 Select T Template (white areas ignored):").pack(anchor="w", padx=10)
+    ttk.Label(root, text="🖼 Select T Template (PNG, white areas ignored, or JSON template bank):").pack(anchor="w", padx=10)
     ttk.Entry(root, textvariable=template_path, width=60).pack(padx=10)
     ttk.Button(root, text="Browse", command=browse_template).pack(pady=2)
     ttk.Button(root, text="Generate from Video", command=generate_template).pack(pady=2)
@@ -241,12 +190,67 @@ def run_gui():
     scale_var = tk.StringVar(value="1/2")
     ttk.Combobox(root, textvariable=scale_var, values=["1x", "1/2", "1/4", "1/8"]).pack(padx=10)
 
+    ttk.Label(root, text="🧵 Processus parallèles:").pack(anchor="w", padx=10)
+    workers_var = tk.IntVar(value=1)
+    ttk.Spinbox(
+        root, from_=1, to=os.cpu_count() or 1, textvariable=workers_var, width=5, command=fixed_grid_changed
+    ).pack(padx=10)
+
+    ttk.Label(root, text="🧮 Méthode de matching (pyramid = criblage basse résolution, fft = par lots, integral = rectangles du T):").pack(anchor="w", padx=10)
+    backend_var = tk.StringVar(value="matchTemplate")
+    ttk.Combobox(root, textvariable=backend_var, values=list(MATCHER_BACKENDS), state="readonly").pack(padx=10)
+
+    ttk.Label(root, text="🎞 Décodage (ffmpeg = luminance seule, déjà réduite):").pack(anchor="w", padx=10)
+    decoder_var = tk.StringVar(value="opencv")
+    ttk.Combobox(root, textvariable=decoder_var, values=DECODERS, state="readonly").pack(padx=10)
+
+    ttk.Label(root, text="⏭ Ignorer les frames statiques (écart max en niveaux de gris, 0 = non):").pack(
+        anchor="w", padx=10
+    )
+    gate_var = tk.IntVar(value=4)
+    ttk.Spinbox(root, from_=0, to=64, textvariable=gate_var, width=5).pack(padx=10)
+
+    roi_var = tk.BooleanVar(value=True)
+    ttk.Checkbutton(root, text="🔲 Apprendre la position du T (recherche ROI)", variable=roi_var).pack(anchor="w", padx=10)
+
+    adaptive_var = tk.BooleanVar(value=False)
+    ttk.Checkbutton(
+        root,
+        text=f"🔢 Pas adaptatif (sauts jusqu'à {ADAPTIVE_MAX_SECONDS}s loin du seuil, sans cache ni processus parallèles)",
+        variable=adaptive_var,
+        command=adaptive_toggled,
+    ).pack(anchor="w", padx=10)
+
+    ttk.Label(root, text="📥 Préchargement : frames décodées d'avance sur des threads (0 = non):").pack(
+        anchor="w", padx=10
+    )
+    prefetch_var = tk.IntVar(value=0)
+    ttk.Spinbox(root, from_=0, to=8 * PREFETCH_DEPTH, textvariable=prefetch_var, width=5).pack(padx=10)
+
+    cache_var = tk.BooleanVar(value=True)
+    ttk.Checkbutton(
+        root, text="💾 Réutiliser les scores en cache", variable=cache_var, command=fixed_grid_changed
+    ).pack(anchor="w", padx=10)
+
+    profile_var = tk.BooleanVar(value=PROFILER.enabled)
+    ttk.Checkbutton(root, text="⏱ Profiler les étapes (seek, décodage, matching...)", variable=profile_var).pack(
+        anchor="w", padx=10
+    )
+
     detect_button = ttk.Button(root, text="▶️ Launch Detection", command=launch_detection)
-    detect_button.pack(pady=10)
+    detect_button.pack(pady=(10, 2))
+    cancel_button = ttk.Button(root, text="⏹ Annuler", command=cancel_detection, state=tk.DISABLED)
+    cancel_button.pack(pady=(0, 10))
+
+    progress_bar = ttk.Progressbar(root, maximum=100)
+    progress_bar.pack(padx=10, fill="x")
+    progress_label = ttk.Label(root, text="")
+    progress_label.pack(anchor="w", padx=10)
 
     log_text = tk.Text(root, height=20, width=80)
     log_text.pack(padx=10, pady=10)
 
+    drain_channel()
     root.mainloop()
 
 if __name__ == "__main__":
@@ -0,0 +1,140 @@
+import time
+
+import cv2
+
+from adaptive_stride import next_stride
+from fft_matcher import FFTBatchMatcher
+from integral_matcher import IntegralTMatcher
+from onset_search import find_rising_edge
+from pyramid_matcher import PyramidMatcher
+from stage_profiler import PROFILER
+
+LOOKBACK_SECONDS = 180
+COOLDOWN_SECONDS = 120
+
+
+def load_t_template(template_path, scale_factor):
+    """Load the grayscale T template and its mask (white areas ignored) at ``scale_factor``."""
+    template_orig = cv2.imread(template_path, cv2.IMREAD_GRAYSCALE)
+    if template_orig is None:
+        raise FileNotFoundError(f"Template introuvable : {template_path}")
+    _, mask_orig = cv2.threshold(template_orig, 250, 255, cv2.THRESH_BINARY_INV)
+
+    if scale_factor != 1.0:
+        template = cv2.resize(template_orig, (0, 0), fx=scale_factor, fy=scale_factor)
+        mask = cv2.resize(mask_orig, (0, 0), fx=scale_factor, fy=scale_factor, interpolation=cv2.INTER_NEAREST)
+    else:
+        template = template_orig
+        mask = mask_orig
+    return template, mask
+
+
+class TemplateMatcher:
+    """Masked ``TM_CCOEFF_NORMED`` over the whole analysis frame."""
+
+    name = "matchTemplate"
+
+    def __init__(self, template, mask):
+        self.template = template
+        self.mask = mask
+
+    def match(self, gray):
+        """Return ``(max_val, max_loc)`` of the template in a grayscale frame."""
+        res = cv2.matchTemplate(gray, self.template, cv2.TM_CCOEFF_NORMED, mask=self.mask)
+        _, max_val, _, max_loc = cv2.minMaxLoc(res)
+        return max_val, max_loc
+
+
+MATCHER_BACKENDS = {cls.name: cls for cls in (TemplateMatcher, PyramidMatcher, FFTBatchMatcher, IntegralTMatcher)}
+
+
+def make_matcher(template, mask, backend=TemplateMatcher.name):
+    """Build the matcher registered as ``backend`` in ``MATCHER_BACKENDS``."""
+    if backend not in MATCHER_BACKENDS:
+        raise ValueError(f"Méthode de matching inconnue : {backend}")
+    return MATCHER_BACKENDS[backend](template, mask)
+
+
+def _score_batch(matcher, batch):
+    start = time.perf_counter()
+    if len(batch) > 1:
+        results = matcher.match_batch([gray for _, gray in batch])
+    else:
+        results = [matcher.match(gray) for _, gray in batch]
+    PROFILER.add("match", time.perf_counter() - start, len(batch))
+    for (frame_idx, _), (max_val, max_loc) in zip(batch, results):
+        yield frame_idx, max_val, max_loc
+
+
+def scan_grid(sampler, matcher, start, end, step):
+    """Yield ``(frame_idx, score, loc)`` for ``start, start + step, ...`` below ``end`` (None = until EOF).
+
+    Matchers with a ``batch_size`` attribute are fed that many frames at a
+    time through ``match_batch``.
+    """
+    batch_size = getattr(matcher, "batch_size", 1)
+    batch = []
+    frame_idx = start
+    while end is None or frame_idx < end:
+        ret, gray = sampler.read_gray(frame_idx)
+        if not ret:
+            break
+        batch.append((frame_idx, gray))
+        frame_idx += step
+        if len(batch) >= batch_size:
+            yield from _score_batch(matcher, batch)
+            batch = []
+    yield from _score_batch(matcher, batch)
+
+
+def scan_cooldown(sampler, matcher, start, step, threshold, cooldown, max_step=None):
+    """Yield ``(frame_idx, score, loc)`` every ``step`` frames from ``start``, jumping ``cooldown`` frames after a match.
+
+    With ``max_step`` the stride adapts between ``step`` and ``max_step``
+    frames to the distance from ``threshold`` (see ``next_stride``).
+    """
+    frame_idx = start
+    prev = None
+    while True:
+        ret, gray = sampler.read_gray(frame_idx)
+        if not ret:
+            break
+        (frame_idx, max_val, max_loc), = _score_batch(matcher, [(frame_idx, gray)])
+        yield frame_idx, max_val, max_loc
+
+        if max_val >= threshold:
+            frame_idx += cooldown
+            prev = None
+        elif max_step:
+            stride = next_stride(
+                max_val,
+                threshold,
+                step,
+                max_step,
+                prev_score=prev[1] if prev else None,
+                prev_stride=frame_idx - prev[0] if prev else None,
+            )
+            prev = (frame_idx, max_val)
+            frame_idx += stride
+        else:
+            frame_idx += step
+
+
+def refine_coarse_match(sampler, coarse_ts, fps, matcher, threshold):
+    """Find the frame where the match seen at ``coarse_ts`` first appeared.
+
+    Returns ``(onset_frame, score)``, searching at most the look-back window
+    before ``coarse_ts``; ``onset_frame`` is -1 when ``coarse_ts`` itself no
+    longer reaches ``threshold``.
+    """
+    hit_frame = int(round(coarse_ts * fps))
+    lo = max(hit_frame - int(LOOKBACK_SECONDS * fps), 0)
+
+    def score_at(frame_idx):
+        ret, gray = sampler.read_gray(frame_idx)
+        if not ret:
+            return None
+        with PROFILER.stage("match"):
+            return matcher.match(gray)[0]
+
+    return find_rising_edge(score_at, threshold, hit_frame, lo, first_step=int(fps))
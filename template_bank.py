@@ -0,0 +1,109 @@
+"""Cropped T templates searched only around their expected position.
+
+A bank is a JSON list of entries with the keys ``template`` (PNG, white
+areas ignored), ``mask`` (PNG, non-zero = compared), ``x0``/``y0`` (expected
+top-left corner in full-resolution frame pixels) and ``margin`` (search
+margin in the same pixels), as written by ``generate_t_template_bank``.
+Entries also carry ``name`` and ``threshold``, so a bank is a valid
+``multi_template.py`` configuration; it searches each crop near its
+expected position too (``load_entry_matcher``).
+"""
+import json
+
+import cv2
+import numpy as np
+
+from t_matching import load_t_template, make_matcher
+
+# Search margin (full-resolution pixels) of entries that do not give one.
+DEFAULT_MARGIN = 16
+
+
+class WindowMatcher:
+    """Search ``inner``'s template only in a window around ``(x0, y0)``.
+
+    Locations are reported in frame coordinates. Without an expected
+    position (``x0`` None), or when the window does not fit in the frame,
+    the whole frame is searched.
+    """
+
+    def __init__(self, inner, x0=None, y0=None, margin=DEFAULT_MARGIN):
+        self.inner = inner
+        self.name = inner.name
+        self.mask = inner.mask
+        self.x0 = x0
+        self.y0 = y0
+        self.margin = margin
+
+    def match(self, gray):
+        """Return ``(max_val, max_loc)`` of the template in a grayscale frame."""
+        if self.x0 is None:
+            return self.inner.match(gray)
+        h, w = self.inner.template.shape[:2]
+        frame_h, frame_w = gray.shape[:2]
+        left, top = max(self.x0 - self.margin, 0), max(self.y0 - self.margin, 0)
+        right = min(self.x0 + w + self.margin, frame_w)
+        bottom = min(self.y0 + h + self.margin, frame_h)
+        if right - left < w or bottom - top < h:
+            return self.inner.match(gray)
+        max_val, (dx, dy) = self.inner.match(gray[top:bottom, left:right])
+        return max_val, (left + dx, top + dy)
+
+
+class TemplateBankMatcher:
+    """Best match over several cropped templates, each searched near its expected position.
+
+    ``last_name`` is the name of the entry that gave the last best score.
+    """
+
+    def __init__(self, matchers, names):
+        self.matchers = matchers
+        self.names = names
+        self.name = f"bank+{matchers[0].name}"
+        self.mask = np.concatenate([m.mask.ravel() for m in matchers])
+        self.last_name = None
+
+    def match(self, gray):
+        """Return ``(max_val, max_loc)`` of the best-scoring template in a grayscale frame."""
+        best_val, best_loc = -1.0, (0, 0)
+        for matcher, name in zip(self.matchers, self.names):
+            max_val, max_loc = matcher.match(gray)
+            if max_val > best_val:
+                best_val, best_loc = max_val, max_loc
+                self.last_name = name
+        return best_val, best_loc
+
+
+def load_entry_matcher(entry, scale_factor, backend="matchTemplate"):
+    """Return the ``WindowMatcher`` of one bank entry at ``scale_factor``."""
+    template, mask = load_t_template(entry["template"], scale_factor)
+    if entry.get("mask"):
+        mask = cv2.imread(entry["mask"], cv2.IMREAD_GRAYSCALE)
+        if mask is None:
+            raise FileNotFoundError(f"Masque introuvable : {entry['mask']}")
+        mask = cv2.resize(mask, template.shape[::-1], interpolation=cv2.INTER_NEAREST)
+    inner = make_matcher(template, mask, backend)
+    if "x0" not in entry:
+        return WindowMatcher(inner)
+    margin = max(int(round(entry.get("margin", DEFAULT_MARGIN) * scale_factor)), 1)
+    x0, y0 = int(round(entry["x0"] * scale_factor)), int(round(entry["y0"] * scale_factor))
+    return WindowMatcher(inner, x0, y0, margin)
+
+
+def load_template_bank(bank_path, scale_factor, backend="matchTemplate"):
+    """Build a ``TemplateBankMatcher`` from the bank file ``bank_path`` at ``scale_factor``."""
+    with open(bank_path, "r", encoding="utf-8") as f:
+        entries = json.load(f)
+    if not entries:
+        raise ValueError(f"Banque de templates vide : {bank_path}")
+
+    matchers = [load_entry_matcher(entry, scale_factor, backend) for entry in entries]
+    return TemplateBankMatcher(matchers, [entry.get("name", entry["template"]) for entry in entries])
+
+
+def load_t_matcher(template_path, scale_factor, backend="matchTemplate"):
+    """Return the matcher of a T template PNG, or of a template bank (``.json``)."""
+    if template_path.lower().endswith(".json"):
+        return load_template_bank(template_path, scale_factor, backend)
+    template, mask = load_t_template(template_path, scale_factor)
+    return make_matcher(template, mask, backend)
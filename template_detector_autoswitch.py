@@ -1,8 +1,12 @@
 import cv2
-import numpy as np
-import json
 import csv
 
+from compiled_template import load_compiled_template
+from frame_sampler import open_sampler
+from orb_matcher import OrbMatcher
+from stage_profiler import PROFILER
+from window_tracker import WindowTracker
+
 # === CONFIGURATION ===
 # === CONFIGURATION ===
 VB_PATH= "C:/Users/Vincent B/Videos/Brads/slowblues/"
@@ -13,49 +17,67 @@ OUTPUT_CSV_PATH = "C:/Users/Vincent B/Videos/Brads/slowblues/t_hsv_detections.cs
 
 FRAME_IMAGE_PATH = "C:/Users/Vincent B/Videos/Brads/slowblues/template_fullframe.png"
 
-def decide_strategy(template, meta):
-    hsv = cv2.cvtColor(template, cv2.COLOR_BGR2HSV)
-    mean_s = np.mean(hsv[:, :, 1])
-    std_s = np.std(hsv[:, :, 1])
-    w, h = meta["width"], meta["height"]
+# "ffmpeg" : frames en luminance seule décodées par ffmpeg (stratégies template_match et orb)
+DECODER = "opencv"
 
-    orb = cv2.ORB_create()
-    kp, _ = orb.detectAndCompute(template, None)
-    num_kp = len(kp)
+# motion_expected : suivi du motif, recherche dans une fenêtre autour de la position prédite
+TRACKING = True
 
-    print(f"[DEBUG] mean_s={mean_s:.2f}, std_s={std_s:.2f}, surface={w*h}, orb_kp={num_kp}")
+# Stratégie orb : nombre de correspondances cohérentes (inliers RANSAC) pour valider une frame
+ORB_MIN_INLIERS = 10
 
-    if mean_s < 20 and std_s < 20 and w * h < 2000:
-        return "template_match"
-    elif num_kp >= 10:
-        return "orb"
-    else:
-        return "hsv"
+# Profil par étape (seek, décodage, conversions, matching) ; aussi activable avec T_DETECTOR_PROFILE=1
+PROFILE = False
+PROFILE_PATH = "C:/Users/Vincent B/Videos/Brads/slowblues/autoswitch_profile.json"
+PROFILER.enabled = PROFILE or PROFILER.enabled
+
+# === CHARGEMENT TEMPLATE + MÉTA (formes dérivées et stratégie en cache à côté de template_meta.json) ===
+compiled = load_compiled_template(TEMPLATE_IMAGE_PATH, TEMPLATE_META_PATH)
+template = compiled.template
+meta = compiled.meta
 
+x0, y0, w, h = compiled.x0, compiled.y0, compiled.width, compiled.height
+motion_expected = compiled.motion_expected
+strategy = compiled.strategy
 
+print(
+    f"[DEBUG] mean_s={compiled.mean_s:.2f}, std_s={compiled.std_s:.2f}, surface={w*h}, "
+    f"orb_kp={len(compiled.keypoints)}"
+)
 
-# === CHARGEMENT TEMPLATE + MÉTA ===
-template = cv2.imread(TEMPLATE_IMAGE_PATH)
-frame_img = cv2.imread(FRAME_IMAGE_PATH)
-with open(TEMPLATE_META_PATH, "r", encoding="utf-8") as f:
-    meta = json.load(f)
+print(f"🧠 Méthode choisie : {strategy} — motion_expected={motion_expected}")
 
-x0, y0, w, h = meta["x0"], meta["y0"], meta["width"], meta["height"]
-motion_expected = meta.get("motion_expected", False)
+# Descripteurs ORB du template lus depuis le cache ; hors mouvement, seule la ROI est analysée
+if strategy == "orb":
+    orb_matcher = OrbMatcher(
+        compiled.keypoints,
+        compiled.descriptors,
+        roi=None if motion_expected else (x0, y0, w, h),
+        min_inliers=ORB_MIN_INLIERS,
+    )
 
-# === ANALYSE DU TEMPLATE POUR CHOIX DE STRATÉGIE ===
-template_hsv = cv2.cvtColor(template, cv2.COLOR_BGR2HSV)
-mean_s = np.mean(template_hsv[:, :, 1])
-std_s = np.std(template_hsv[:, :, 1])
 
-orb = cv2.ORB_create()
-kp, _ = orb.detectAndCompute(template, None)
-num_kp = len(kp)
-strategy = decide_strategy(template, meta)
+def locate_template(gray):
+    res = cv2.matchTemplate(gray, compiled.gray, cv2.TM_CCOEFF_NORMED)
+    _, max_val, _, max_loc = cv2.minMaxLoc(res)
+    return (*max_loc, max_val) if max_val > 0.9 else None
 
-print(f"[DEBUG] mean_s={mean_s:.2f}, std_s={std_s:.2f}, surface={w*h}, orb_kp={num_kp}")
 
-print(f"🧠 Méthode choisie : {strategy} — motion_expected={motion_expected}")
+def locate_hsv(frame):
+    hsv = cv2.cvtColor(frame, cv2.COLOR_BGR2HSV)
+    mask = cv2.inRange(hsv, compiled.hsv_lower, compiled.hsv_upper)
+    mask_sum = cv2.countNonZero(mask) * 255
+    if mask_sum <= w*h*100:
+        return None
+    # Position du motif : plus grande zone de la couleur du template
+    contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    x, y, _, _ = cv2.boundingRect(max(contours, key=cv2.contourArea))
+    return x, y, mask_sum
+
+
+tracker = None
+if motion_expected and TRACKING and strategy in ("template_match", "hsv"):
+    tracker = WindowTracker(locate_template if strategy == "template_match" else locate_hsv, w, h)
 
 # === OUVERTURE VIDÉO ===
 cap = cv2.VideoCapture(VIDEO_PATH)
@@ -65,49 +87,72 @@ if not cap.isOpened():
 fps = cap.get(cv2.CAP_PROP_FPS)
 total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
 step = int(fps)  # 1 FPS
+cap.release()
+gray_strategy = strategy in ("template_match", "orb")
+sampler = open_sampler(VIDEO_PATH, decoder=DECODER if gray_strategy else "opencv")
 
 results = []
 
 # === DÉTECTION SELON STRATÉGIE ===
 for frame_idx in range(0, total_frames, step):
-    cap.set(cv2.CAP_PROP_POS_FRAMES, frame_idx)
-    ret, frame = cap.read()
+    if gray_strategy:
+        ret, gray_frame = sampler.read_gray(frame_idx)
+    else:
+        ret, frame = sampler.read(frame_idx)
     if not ret:
         continue
 
-    gray_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-    gray_template = cv2.cvtColor(template, cv2.COLOR_BGR2GRAY)
+    if tracker is not None:
+        with PROFILER.stage("match"):
+            detection = tracker.track(gray_frame if gray_strategy else frame, frame_idx)
+        if detection is not None:
+            x, y, score = detection
+            results.append([round(frame_idx / fps, 2), x, y, w, h, round(score, 3)])
 
-    if strategy == "template_match":
+    elif strategy == "template_match":
         if motion_expected:
-            res = cv2.matchTemplate(gray_frame, gray_template, cv2.TM_CCOEFF_NORMED)
-            _, max_val, _, max_loc = cv2.minMaxLoc(res)
+            with PROFILER.stage("match"):
+                res = cv2.matchTemplate(gray_frame, compiled.gray, cv2.TM_CCOEFF_NORMED)
+                _, max_val, _, max_loc = cv2.minMaxLoc(res)
             if max_val > 0.9:
                 results.append([round(frame_idx / fps, 2), *max_loc, w, h, round(max_val, 3)])
         else:
             roi = gray_frame[y0:y0 + h, x0:x0 + w]
-            res = cv2.matchTemplate(roi, gray_template, cv2.TM_CCOEFF_NORMED)
+            with PROFILER.stage("match"):
+                res = cv2.matchTemplate(roi, compiled.gray, cv2.TM_CCOEFF_NORMED)
             score = res[0][0]
             if score > 0.9:
                 results.append([round(frame_idx / fps, 2), x0, y0, w, h, round(score, 3)])
 
+    elif strategy == "orb":
+        with PROFILER.stage("match"):
+            inliers, loc = orb_matcher.locate(gray_frame)
+        if inliers >= ORB_MIN_INLIERS:
+            results.append([round(frame_idx / fps, 2), *loc, w, h, inliers])
+
     elif strategy == "hsv":
-        hsv_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2HSV)
-        mean_hsv = cv2.mean(template_hsv)[:3]
-        lower = np.array([max(0, mean_hsv[0]-15), max(0, mean_hsv[1]-50), max(0, mean_hsv[2]-50)])
-        upper = np.array([min(179, mean_hsv[0]+15), min(255, mean_hsv[1]+50), min(255, mean_hsv[2]+50)])
+        # En mode fixe, seule la ROI est convertie en HSV
+        with PROFILER.stage("hsv"):
+            hsv_frame = cv2.cvtColor(frame if motion_expected else frame[y0:y0 + h, x0:x0 + w], cv2.COLOR_BGR2HSV)
         if motion_expected:
-            mask = cv2.inRange(hsv_frame, lower, upper)
-            if np.sum(mask) > w*h*100:
-                results.append([round(frame_idx / fps, 2), 0, 0, 0, 0, np.sum(mask)])
+            with PROFILER.stage("classify"):
+                mask = cv2.inRange(hsv_frame, compiled.hsv_lower, compiled.hsv_upper)
+                mask_sum = cv2.countNonZero(mask) * 255
+            if mask_sum > w*h*100:
+                results.append([round(frame_idx / fps, 2), 0, 0, 0, 0, mask_sum])
         else:
-            roi = hsv_frame[y0:y0 + h, x0:x0 + w]
-            mask = cv2.inRange(roi, lower, upper)
-            match_ratio = np.sum(mask > 0) / (w * h)
+            with PROFILER.stage("classify"):
+                mask = cv2.inRange(hsv_frame, compiled.hsv_lower, compiled.hsv_upper)
+                match_ratio = cv2.countNonZero(mask) / (w * h)
             if match_ratio > 0.5:
                 results.append([round(frame_idx / fps, 2), x0, y0, w, h, round(match_ratio, 2)])
 
-cap.release()
+sampler.release()
+if tracker is not None:
+    print(
+        f"🎯 Suivi : {tracker.window_searches} recherches locales, {tracker.full_searches} plein cadre, "
+        f"{tracker.losses} pertes de suivi"
+    )
 
 # === EXPORT CSV ===
 with open(OUTPUT_CSV_PATH, "w", newline="", encoding="utf-8") as f:
@@ -116,6 +161,7 @@ with open(OUTPUT_CSV_PATH, "w", newline="", encoding="utf-8") as f:
     writer.writerows(results)
 
 print(f"✅ Détection terminée. {len(results)} résultats enregistrés dans {OUTPUT_CSV_PATH}")
+PROFILER.report(print, PROFILE_PATH)
 import pandas as pd
 import matplotlib.pyplot as plt
 
@@ -131,26 +177,23 @@ if len(df) > 0:
     best_time = best_row["timestamp_sec"]
     print(f"🎯 Best match initial à {best_time:.2f}s → score={best_row['score']}")
 
-    cap = cv2.VideoCapture(VIDEO_PATH)
-    fps = cap.get(cv2.CAP_PROP_FPS)
+    sampler = open_sampler(VIDEO_PATH, decoder=DECODER)
+    fps = sampler.fps
     best_frame = int(best_time * fps)
     window = int(fps * 0.1)  # ±100ms → environ 6 frames à 60fps
-    template_gray = cv2.cvtColor(template, cv2.COLOR_BGR2GRAY)
 
     refined = []
     for i in range(-window, window + 1):
         frame_idx = best_frame + i
         if frame_idx < 0:
             continue
-        cap.set(cv2.CAP_PROP_POS_FRAMES, frame_idx)
-        ret, frame = cap.read()
+        ret, gray = sampler.read_gray(frame_idx)
         if not ret:
             continue
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        res = cv2.matchTemplate(gray, template_gray, cv2.TM_CCOEFF_NORMED)
+        res = cv2.matchTemplate(gray, compiled.gray, cv2.TM_CCOEFF_NORMED)
         _, max_val, _, _ = cv2.minMaxLoc(res)
         refined.append((frame_idx / fps, max_val))
-    cap.release()
+    sampler.release()
 
     refined_df = pd.DataFrame(refined, columns=["timestamp_sec", "score"])
     best_refined = refined_df.loc[refined_df["score"].idxmax()]
@@ -0,0 +1,74 @@
+import random
+
+import pytest
+
+from adaptive_stride import AdaptiveScan, next_stride
+
+
+def test_next_stride_far_and_near_threshold():
+    assert next_stride(0.1, 0.85, 1, 30) == 30
+    assert next_stride(0.85, 0.85, 1, 30) == 1
+    assert next_stride(0.7, 0.85, 1, 30) == 15
+
+
+def test_next_stride_slows_down_when_score_moves_towards_threshold():
+    # 1/32 per frame with 0.25 to go: at most half of the 8 frames left.
+    assert next_stride(0.5, 0.75, 1, 30, prev_score=0.25, prev_stride=8) == 4
+
+
+def _runs_timeline(n_frames, runs):
+    def score_at(frame_idx):
+        if frame_idx >= n_frames:
+            return None
+        return 0.95 if any(start <= frame_idx < end for start, end in runs) else 0.1
+
+    return score_at
+
+
+@pytest.mark.parametrize("seed", range(50))
+@pytest.mark.parametrize("tolerance", [1, 4])
+def test_edges_of_long_runs_are_bracketed(seed, tolerance):
+    rng = random.Random(seed)
+    max_step = rng.choice([8, 30, 60])
+    n_frames = rng.randint(200, 3000)
+    runs, frame_idx = [], rng.randint(0, 200)
+    while frame_idx < n_frames:
+        length = rng.randint(max_step + 1, 5 * max_step)
+        runs.append((frame_idx, frame_idx + length))
+        # Dips shorter than max_step may fall between two samples, like short runs.
+        frame_idx += length + rng.randint(max_step + 1, 400)
+
+    scan = AdaptiveScan(_runs_timeline(n_frames, runs), 0.85, 1, max_step, tolerance=tolerance)
+    samples = list(scan.scan())
+    frames = [f for f, _ in samples]
+    assert frames == sorted(set(frames))
+    assert scan.samples == len(samples)
+    assert frames[-1] > n_frames - max_step - 1
+
+    above = {f: score >= 0.85 for f, score in samples}
+    for start, end in runs:
+        for edge in (start, end):
+            # Past the last sample the run is cut by the end of the video.
+            if edge == 0 or edge > frames[-1]:
+                continue
+            before = max(f for f in frames if f < edge)
+            after = min(f for f in frames if f >= edge)
+            assert after - before <= tolerance
+            assert above[before] != above[after]
+
+
+def test_nan_scores_use_the_full_stride():
+    nan = float("nan")
+    assert next_stride(nan, 0.85, 1, 30) == 30
+    assert next_stride(0.1, 0.85, 1, 30, prev_score=nan, prev_stride=30) == 30
+
+    # NaN until frame 300, then a run: the scan strides over the NaNs and still finds its edge.
+    def score_at(frame_idx):
+        if frame_idx >= 600:
+            return None
+        return 0.95 if 300 <= frame_idx < 400 else nan if frame_idx < 300 else 0.1
+
+    samples = list(AdaptiveScan(score_at, 0.85, 1, 30).scan())
+    frames = [f for f, _ in samples]
+    assert 299 in frames and 300 in frames
+    assert len(frames) < 60
@@ -0,0 +1,73 @@
+import pytest
+
+from parallel_scan import apply_cooldown
+from t_detector import coarse_plan
+from t_matching import scan_cooldown, scan_grid
+
+THRESHOLD = 0.75
+RUNS = [(300, 420), (2000, 2100), (2250, 2400)]
+COOLDOWN = 300
+
+
+class FakeSampler:
+    """Sampler whose "frame" is its index, up to ``n_frames``."""
+
+    def __init__(self, n_frames):
+        self.n_frames = n_frames
+        self.reads = []
+
+    def read_gray(self, frame_idx, out=None):
+        if frame_idx >= self.n_frames:
+            return False, None
+        self.reads.append(frame_idx)
+        return True, frame_idx
+
+
+class RunsMatcher:
+    name = "runs"
+    mask = None
+
+    def match(self, frame_idx):
+        score = 0.95 if any(start <= frame_idx < end for start, end in RUNS) else 0.1
+        return score, (0, 0)
+
+
+@pytest.mark.parametrize(
+    "options, expected",
+    [
+        ((1, False, 0, False), ("sequential", 0, False, [])),
+        ((1, False, 0, True), ("sequential", 0, True, [])),
+        ((1, False, 4, False), ("prefetch", 4, False, [])),
+        ((1, False, 4, True), ("sequential", 0, True, ["prefetch"])),
+        ((1, True, 0, False), ("timeline", 0, False, [])),
+        ((1, True, 4, False), ("timeline", 4, False, [])),
+        ((1, True, 4, True), ("timeline", 4, False, ["adaptive_stride"])),
+        ((4, False, 0, True), ("timeline", 0, False, ["adaptive_stride"])),
+        ((4, False, 4, False), ("timeline", 0, False, ["prefetch"])),
+        ((4, True, 4, True), ("timeline", 0, False, ["adaptive_stride", "prefetch"])),
+    ],
+)
+def test_coarse_plan_combinations(options, expected):
+    assert coarse_plan(*options) == expected
+
+
+def test_cooldown_scan_matches_the_filtered_full_grid():
+    # With a cooldown on the grid, skipping it or filtering it afterwards finds the same matches.
+    sampler = FakeSampler(3000)
+    skipped = list(scan_cooldown(sampler, RunsMatcher(), 0, 30, THRESHOLD, COOLDOWN))
+    full = list(scan_grid(FakeSampler(3000), RunsMatcher(), 0, None, 30))
+
+    assert len(skipped) < len(full)
+    assert list(apply_cooldown(skipped, THRESHOLD, COOLDOWN)) == list(apply_cooldown(full, THRESHOLD, COOLDOWN))
+    assert [f for f, _ in apply_cooldown(skipped, THRESHOLD, COOLDOWN)] == [300, 2010, 2310]
+    assert sampler.reads == [f for f, _, _ in skipped]
+
+
+def test_adaptive_scan_samples_less_and_finds_runs_longer_than_its_stride():
+    fixed = list(scan_cooldown(FakeSampler(3000), RunsMatcher(), 0, 30, THRESHOLD, COOLDOWN))
+    adaptive = list(scan_cooldown(FakeSampler(3000), RunsMatcher(), 0, 30, THRESHOLD, COOLDOWN, max_step=90))
+
+    assert len(adaptive) < len(fixed)
+    matches = [f for f, _ in apply_cooldown(adaptive, THRESHOLD, COOLDOWN)]
+    assert len(matches) == 3
+    assert all(any(start <= f < end for start, end in RUNS) for f in matches)
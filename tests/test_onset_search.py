@@ -0,0 +1,40 @@
+import pytest
+
+from onset_search import find_rising_edge
+
+
+def _step_scores(onset, offset=None):
+    calls = []
+
+    def score_at(frame_idx):
+        calls.append(frame_idx)
+        return 0.9 if onset <= frame_idx and (offset is None or frame_idx < offset) else 0.1
+
+    return score_at, calls
+
+
+@pytest.mark.parametrize("first_step", [1, 30])
+@pytest.mark.parametrize("onset", [0, 1, 17, 29, 30, 31, 500, 1234])
+def test_finds_first_matching_frame(onset, first_step):
+    for hit in (onset, onset + 1, onset + 29, onset + 30, onset + 997):
+        score_at, calls = _step_scores(onset, offset=onset + 1000)
+        assert find_rising_edge(score_at, 0.75, hit, 0, first_step) == (onset, 0.9)
+        # Galloping and bisection: a few dozen reads, not a linear scan.
+        assert len(calls) <= 2 * (hit - onset + 1).bit_length() + 20
+
+
+def test_stops_at_lower_bound():
+    score_at, _ = _step_scores(0)
+    assert find_rising_edge(score_at, 0.75, 900, 600, 30) == (600, 0.9)
+
+
+def test_hit_below_threshold():
+    score_at, _ = _step_scores(100)
+    assert find_rising_edge(score_at, 0.75, 50, 0, 30) == (-1, 0.1)
+
+
+def test_unreadable_frames_do_not_match():
+    def score_at(frame_idx):
+        return None if frame_idx < 40 else 0.9
+
+    assert find_rising_edge(score_at, 0.75, 200, 0, 30) == (40, 0.9)
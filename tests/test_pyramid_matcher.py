@@ -0,0 +1,51 @@
+import cv2
+import numpy as np
+import pytest
+
+from pyramid_matcher import PyramidMatcher
+from t_matching import TemplateMatcher, load_t_template
+
+WIDTH, HEIGHT = 960, 540
+
+
+def _draw_t(image, value=0):
+    """Draw the T of ``generate_t_template_from_video`` (thickness 1% of the width, bar at 75%)."""
+    thickness = int(WIDTH * 0.01)
+    y_bar = int(HEIGHT * 0.75)
+    image[y_bar - thickness // 2:y_bar + thickness // 2 + 1, :] = value
+    image[:y_bar + 1, WIDTH // 2 - thickness // 2:WIDTH // 2 + thickness // 2 + 1] = value
+    return image
+
+
+@pytest.fixture
+def t_frame():
+    rng = np.random.default_rng(0)
+    texture = rng.integers(60, 200, (HEIGHT, WIDTH), dtype=np.uint8)
+    return _draw_t(cv2.GaussianBlur(texture, (5, 5), 0))
+
+
+@pytest.mark.parametrize("scale_factor", [0.5, 0.25, 0.125])
+def test_full_frame_template_scores_like_match_template(tmp_path, t_frame, scale_factor):
+    template_path = str(tmp_path / "t_template.png")
+    cv2.imwrite(template_path, _draw_t(np.full((HEIGHT, WIDTH), 255, np.uint8)))
+    template, mask = load_t_template(template_path, scale_factor)
+    gray = cv2.resize(t_frame, (0, 0), fx=scale_factor, fy=scale_factor)
+
+    expected_val, expected_loc = TemplateMatcher(template, mask).match(gray)
+    max_val, max_loc = PyramidMatcher(template, mask, coarse_scale=0.125).match(gray)
+    assert expected_val > 0.9
+    assert max_val == pytest.approx(expected_val, abs=1e-4)
+    assert max_loc == expected_loc
+
+
+@pytest.mark.parametrize("coarse_scale", [0.5, 0.25, 0.2, 0.125])
+def test_crop_template_scores_like_match_template(t_frame, coarse_scale):
+    # Crop around the junction of the bar and the stem, as in Dall3.
+    x0, y0 = WIDTH // 2 - 36, int(HEIGHT * 0.75) - 36
+    template = t_frame[y0:y0 + 72, x0:x0 + 72].copy()
+
+    expected_val, expected_loc = TemplateMatcher(template, None).match(t_frame)
+    max_val, max_loc = PyramidMatcher(template, coarse_scale=coarse_scale).match(t_frame)
+    assert expected_loc == (x0, y0)
+    assert max_val == pytest.approx(expected_val, abs=1e-4)
+    assert max_loc == expected_loc
@@ -0,0 +1,78 @@
+import random
+
+import pytest
+
+from segment_tracker import DecimatedCurve, SegmentTracker
+
+
+def _batch_segments(samples, threshold, min_duration, min_gap):
+    """Dall3's former post-processing: whole-list edge detection, then merging on rounded times."""
+    detections = []
+    start_ts = None
+    for t, score in samples:
+        if score >= threshold:
+            if start_ts is None:
+                start_ts = t
+        elif start_ts is not None:
+            if t - start_ts >= min_duration:
+                detections.append([round(start_ts, 3), round(t - start_ts, 3)])
+            start_ts = None
+    if start_ts is not None and samples[-1][0] - start_ts >= min_duration:
+        detections.append([round(start_ts, 3), round(samples[-1][0] - start_ts, 3)])
+
+    merged = []
+    for d in detections:
+        if merged and d[0] - (merged[-1][0] + merged[-1][1]) < min_gap:
+            merged[-1][1] = round((d[0] + d[1]) - merged[-1][0], 3)
+        else:
+            merged.append(d)
+    return [tuple(d) for d in merged]
+
+
+def _streamed_segments(samples, threshold, min_duration, min_gap):
+    tracker = SegmentTracker(threshold, threshold, min_duration, min_gap)
+    segments = []
+    for t, score in samples:
+        segments.extend(tracker.push(t, score))
+    return segments + tracker.finish()
+
+
+def test_gap_of_exactly_min_gap_separates():
+    # 8.1 - 4.1 is 3.999... in floating point, 4.0 once rounded to the millisecond.
+    times = [i * 0.1 for i in range(120)]
+    scores = [1.0 if 10 <= i < 41 or 81 <= i < 100 else 0.0 for i in range(120)]
+    samples = list(zip(times, scores))
+    assert _streamed_segments(samples, 0.85, 1.0, 4.0) == [(1.0, 3.1), (8.1, 1.9)]
+    assert _streamed_segments(samples, 0.85, 1.0, 4.0) == _batch_segments(samples, 0.85, 1.0, 4.0)
+
+
+def test_open_segment_at_end_of_stream():
+    samples = [(0.0, 0.0), (1.0, 0.9), (2.0, 0.9), (3.0, 0.9)]
+    assert _streamed_segments(samples, 0.85, 1.0, 4.0) == [(1.0, 2.0)]
+
+
+@pytest.mark.parametrize("seed", range(200))
+def test_matches_batch_post_processing(seed):
+    rng = random.Random(seed)
+    fps = rng.choice([25, 29.97, 30, 59.94])
+    skip = rng.choice([1, 5, 15])
+    scores, on = [], False
+    for _ in range(rng.randint(1, 400)):
+        if rng.random() < 0.08:
+            on = not on
+        scores.append(rng.uniform(0.85, 1.0) if on else rng.uniform(0.0, 0.85))
+    samples = [(i * skip / fps, score) for i, score in enumerate(scores)]
+    min_gap = rng.choice([0.5, 2.0, 4.0])
+    assert _streamed_segments(samples, 0.85, 1.0, min_gap) == _batch_segments(samples, 0.85, 1.0, min_gap)
+
+
+def test_decimated_curve_is_bounded_and_keeps_peaks():
+    curve = DecimatedCurve(100)
+    for i in range(10_000):
+        curve.push(i / 30, 0.9 if i == 7_777 else 0.1)
+    assert 50 <= len(curve.points) <= 100
+    times = [t for t, _ in curve.points]
+    assert times == sorted(times) and times[0] == 0.0
+    peak = max(curve.points, key=lambda p: p[1])
+    assert peak[1] == 0.9
+    assert peak[0] <= 7_777 / 30 < peak[0] + curve.bucket / 30
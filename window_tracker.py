@@ -0,0 +1,104 @@
+# Pixels searched around the predicted box, plus this share of the predicted displacement.
+SEARCH_MARGIN = 16
+MOTION_MARGIN = 0.5
+# Share of the prediction error fed back into the velocity (alpha-beta filter, alpha = 1).
+VELOCITY_GAIN = 0.5
+
+
+class WindowTracker:
+    """Follow a moving template and search only a window around its predicted position.
+
+    ``locate(image)`` returns None or a detection tuple whose first two
+    items are the template's top-left corner in ``image``; ``track``
+    returns it shifted to frame coordinates. Once the template is found,
+    its next position is predicted with a constant-velocity model (a
+    steady-state Kalman, i.e. alpha-beta, filter) and only the predicted
+    ``width`` x ``height`` box, padded by ``margin`` pixels plus
+    ``motion_margin`` of the predicted displacement (one template size more
+    while the velocity is unknown), is searched. When that window misses,
+    the track is lost and the frame is searched in full, as are the
+    following frames until the template is found again.
+    """
+
+    def __init__(
+        self,
+        locate,
+        width,
+        height,
+        margin=SEARCH_MARGIN,
+        motion_margin=MOTION_MARGIN,
+        velocity_gain=VELOCITY_GAIN,
+    ):
+        self.locate = locate
+        self.width = width
+        self.height = height
+        self.margin = margin
+        self.motion_margin = motion_margin
+        self.velocity_gain = velocity_gain
+
+        self.position = None
+        self.velocity = (0.0, 0.0)
+        self.fixes = 0
+        self.last_frame = None
+        self.window_searches = 0
+        self.full_searches = 0
+        self.losses = 0
+
+    def _window(self, frame_idx, frame_shape):
+        """Return ``(x0, y0, x1, y1)`` and the predicted position, or None if the window is cut off."""
+        dt = frame_idx - self.last_frame
+        px = self.position[0] + self.velocity[0] * dt
+        py = self.position[1] + self.velocity[1] * dt
+        mx = self.margin + int(abs(self.velocity[0] * dt) * self.motion_margin)
+        my = self.margin + int(abs(self.velocity[1] * dt) * self.motion_margin)
+        if self.fixes < 2:
+            # Velocity still unknown: allow a move of one template size.
+            mx += self.width
+            my += self.height
+        frame_h, frame_w = frame_shape[:2]
+        x0, y0 = max(int(round(px)) - mx, 0), max(int(round(py)) - my, 0)
+        x1 = min(int(round(px)) + self.width + mx, frame_w)
+        y1 = min(int(round(py)) + self.height + my, frame_h)
+        if x1 - x0 < self.width or y1 - y0 < self.height:
+            return None
+        return (x0, y0, x1, y1), (px, py)
+
+    def _update(self, frame_idx, loc, predicted):
+        if self.position is None:
+            self.velocity = (0.0, 0.0)
+            self.fixes = 0
+        else:
+            dt = frame_idx - self.last_frame
+            if predicted is None or self.fixes == 1:
+                # Second fix, or re-acquired in full: measure the velocity directly.
+                self.velocity = ((loc[0] - self.position[0]) / dt, (loc[1] - self.position[1]) / dt)
+            else:
+                self.velocity = (
+                    self.velocity[0] + self.velocity_gain * (loc[0] - predicted[0]) / dt,
+                    self.velocity[1] + self.velocity_gain * (loc[1] - predicted[1]) / dt,
+                )
+        self.position = loc
+        self.last_frame = frame_idx
+        self.fixes += 1
+
+    def track(self, frame, frame_idx):
+        """Return the detection of the template in ``frame`` (frame coordinates), or None."""
+        if self.position is not None:
+            window = self._window(frame_idx, frame.shape)
+            if window is not None:
+                (x0, y0, x1, y1), predicted = window
+                self.window_searches += 1
+                detection = self.locate(frame[y0:y1, x0:x1])
+                if detection is not None:
+                    detection = (x0 + detection[0], y0 + detection[1], *detection[2:])
+                    self._update(frame_idx, detection[:2], predicted)
+                    return detection
+            self.losses += 1
+
+        self.full_searches += 1
+        detection = self.locate(frame)
+        if detection is None:
+            self.position = None
+        else:
+            self._update(frame_idx, detection[:2], None)
+        return detection